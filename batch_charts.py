@@ -0,0 +1,208 @@
+"""
+Batch rendering of the per-country and per-region charts.
+The total-tourist trend (as in plot_total_visitors_growth) and the monthly
+distribution heatmap (as in plot_monthly_distribution_heatmap) are drawn for
+every country and every region. The visitor cube is grouped once per
+dimension into an entity x year x month array (EntityPanel) instead of
+filtering the data per entity; a process pool then splits the entities
+between workers, and each worker reuses one figure template per chart and
+only swaps the data. Output is a directory tree
+(visualizations/batch/<dimension>/<entity>/trend.png, heatmap.png) or a
+single multi-page PDF.
+
+Usage:
+    python batch_charts.py                                  # countries and regions, one worker per core
+    python batch_charts.py --by region --workers 4
+    python batch_charts.py --pdf visualizations/batch.pdf   # every page in one PDF
+"""
+
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import heatmaps
+import instrumentation
+from dimensions import MONTH_ABBREVIATIONS, MONTH_NAMES
+from instrumentation import stage
+from plot_config import OUTPUT_PROFILES, STANDARD_TITLE_CONFIG, figure_template, pyplot, tight_layout, write_figure
+from visitor_cube import load_classified_cube
+from visitor_queries import COVID_YEARS, normalize_years, years_label
+
+BATCH_DIR = os.path.join('visualizations', 'batch')
+BATCH_DIMENSIONS = ('country', 'region')
+
+class EntityPanel:
+    """Counts per entity (country or region), year and month as an entity x year x 12 array.
+
+    Cells without data are 0; ``observed`` marks the (entity, year) pairs that
+    have at least one month of data.
+    """
+
+    def __init__(self, dimension, entities, years, values, observed):
+        self.dimension = dimension
+        self.entities = pd.Index(entities, name=dimension)
+        self.years = np.asarray(years, dtype=int)
+        self.values = np.asarray(values, dtype=float)
+        self.observed = np.asarray(observed, dtype=bool)
+
+    @classmethod
+    def from_cube(cls, cube, by='country', metric='tourist'):
+        """Panel of ``metric`` per ``by`` from one (year, month, ``by``) roll-up of ``cube``."""
+        with stage(f'entity_panel({by})'):
+            series = cube.rollup('year', 'month', by)[metric]
+            index = series.index
+            entity_codes, entities = pd.factorize(index.get_level_values(by), sort=True)
+            year_codes, years = pd.factorize(index.get_level_values('year'), sort=True)
+            month_codes = pd.Categorical(index.get_level_values('month'), categories=MONTH_NAMES).codes
+            valid = (entity_codes >= 0) & (year_codes >= 0) & (month_codes >= 0)
+            shape = (len(entities), len(years), len(MONTH_NAMES))
+            cells = (entity_codes[valid] * shape[1] + year_codes[valid]) * shape[2] + month_codes[valid]
+            values = np.bincount(cells, weights=series.to_numpy(dtype=float, na_value=0)[valid], minlength=np.prod(shape))
+            observed = np.bincount(cells // shape[2], minlength=shape[0] * shape[1]) > 0
+        return cls(by, entities, years, values.reshape(shape), observed.reshape(shape[:2]))
+
+    def take(self, positions):
+        """Panel of the entities at ``positions``."""
+        return EntityPanel(self.dimension, self.entities[positions], self.years,
+                           self.values[positions], self.observed[positions])
+
+    def drop_years(self, years):
+        """Panel without ``years`` (e.g. the COVID years)."""
+        keep = ~np.isin(self.years, normalize_years(years) or ())
+        return EntityPanel(self.dimension, self.entities, self.years[keep],
+                           self.values[:, keep], self.observed[:, keep])
+
+    def yearly_totals(self):
+        """Entity x year totals, NaN for years without data."""
+        return np.where(self.observed, self.values.sum(axis=2), np.nan)
+
+    def monthly_shares(self):
+        """Entity x year x month percentage of each year's total, NaN for years without data."""
+        totals = self.yearly_totals()[:, :, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(totals > 0, self.values / totals * 100, np.nan)
+
+def entity_slug(name):
+    """File-system friendly name of an entity ('North America' -> 'north_america')."""
+    return re.sub(r'[^a-z0-9]+', '_', str(name).lower()).strip('_')
+
+def _trend_template():
+    def build(ax):
+        line, = ax.plot([], [], color='#1f1f1f', linewidth=4, marker='o', markersize=8)
+        # COVID period markers
+        ax.axvspan(COVID_YEARS[0], COVID_YEARS[-1], alpha=0.3, color='red', label='COVID Period')
+        ax.axvline(x=COVID_YEARS[0], color='red', linestyle='--', alpha=0.7, linewidth=2)
+        ax.axvline(x=COVID_YEARS[-1], color='red', linestyle='--', alpha=0.7, linewidth=2)
+        ax.grid(True, alpha=0.3)
+        ax.legend(loc='upper left')
+        return line
+    return figure_template(('batch_trend',), build, (16, 10), xlabel='Year', ylabel='Total Tourists (In Millions)')
+
+def draw_trend(name, years, totals):
+    """Trend of one entity's yearly totals on the shared template; returns the figure."""
+    template = _trend_template()
+    present = ~np.isnan(totals)
+    template.artists.set_data(years[present], totals[present] / 1e6)
+    template.ax.set_xticks(years[present], years[present], rotation=90)
+    template.ax.relim()
+    template.ax.autoscale_view()
+    template.ax.set_title(f'{name}: Total Tourists ({years_label(years[present])})', **STANDARD_TITLE_CONFIG)
+    tight_layout(template.fig)
+    return template.fig
+
+def draw_heatmap(name, years, shares):
+    """Monthly distribution heatmap of one entity on the shared template; returns the figure."""
+    return heatmaps.draw_heatmap(shares, years, MONTH_ABBREVIATIONS,
+                                 f'{name}: Monthly Distribution of Tourists as % of Annual Total',
+                                 xlabel='Month', ylabel='Year', cbar_label='% of Annual Tourists', key='batch_heatmap')
+
+def _pages(panel, exclude_years):
+    """(entity, chart, figure) for every page of ``panel``; each figure is reused by the next entity."""
+    totals = panel.yearly_totals()
+    heatmap_panel = panel.drop_years(exclude_years)
+    shares = heatmap_panel.monthly_shares()
+    for i, name in enumerate(panel.entities):
+        if not panel.observed[i].any():
+            continue
+        with stage('batch_trend'):
+            fig = draw_trend(name, panel.years, totals[i])
+        yield name, 'trend', fig
+        with stage('batch_heatmap'):
+            fig = draw_heatmap(name, heatmap_panel.years, shares[i])
+        yield name, 'heatmap', fig
+
+def _render_tree(panel, out_dir, exclude_years, output_profile=None):
+    """Write the pages of ``panel`` under ``out_dir``/<dimension>/<entity>/ and return the paths."""
+    if output_profile:
+        import plot_config
+        plot_config.OUTPUT_PROFILE = output_profile
+    paths = []
+    for name, kind, fig in _pages(panel, exclude_years):
+        directory = os.path.join(out_dir, panel.dimension, entity_slug(name))
+        os.makedirs(directory, exist_ok=True)
+        paths.append(write_figure(fig, os.path.join(directory, f'{kind}.png')))
+    return paths, instrumentation.drain()
+
+def _init_worker():
+    # Headless rendering; must happen before pyplot is imported
+    os.environ['MPLBACKEND'] = 'Agg'
+    import matplotlib
+    matplotlib.use('Agg')
+
+def render_batch(by=BATCH_DIMENSIONS, out_dir=BATCH_DIR, pdf_path=None, workers=None,
+                 exclude_years=COVID_YEARS, cube=None, output_profile=None):
+    """Trend and heatmap for every entity of each dimension in ``by``.
+
+    PNGs (or the output profile's format) go to ``out_dir``, rendered across
+    ``workers`` processes that each take an even share of the entities. With
+    ``pdf_path`` every page is written in order into one PDF instead; PDF
+    pages are vector output that must be appended to one file, so they are
+    drawn in this process. Returns the paths written.
+    """
+    if cube is None:
+        cube = load_classified_cube()
+    panels = [EntityPanel.from_cube(cube, dimension) for dimension in by]
+
+    if pdf_path:
+        from matplotlib.backends.backend_pdf import PdfPages
+        pyplot()
+        os.makedirs(os.path.dirname(pdf_path) or '.', exist_ok=True)
+        with stage('batch_pdf'), PdfPages(pdf_path) as pdf:
+            for panel in panels:
+                for _, _, fig in _pages(panel, exclude_years):
+                    pdf.savefig(fig)
+        return [pdf_path]
+
+    workers = workers or os.cpu_count()
+    paths = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = []
+        for panel in panels:
+            # Interleaved shares keep the workers balanced between large and small entities
+            for start in range(min(workers, len(panel.entities))):
+                positions = np.arange(start, len(panel.entities), workers)
+                futures.append(pool.submit(_render_tree, panel.take(positions), out_dir, exclude_years, output_profile))
+        for future in futures:
+            written, records = future.result()
+            paths.extend(written)
+            instrumentation.add_records(records)
+    return sorted(paths)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Render the trend and monthly heatmap for every country and region.')
+    parser.add_argument('--by', nargs='+', choices=BATCH_DIMENSIONS, default=list(BATCH_DIMENSIONS),
+                        help='entity dimensions to render (default: country region)')
+    parser.add_argument('-o', '--out', default=BATCH_DIR, help=f'output directory (default: {BATCH_DIR})')
+    parser.add_argument('--pdf', metavar='PATH', help='write every page into one multi-page PDF instead')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='worker processes (default: CPU count)')
+    parser.add_argument('--output-profile', choices=sorted(OUTPUT_PROFILES), help='image format/resolution preset (default: print)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = render_batch(args.by, args.out, args.pdf, args.workers, output_profile=args.output_profile)
+    print(f'{len(written)} file(s) written in {time.perf_counter() - start:.1f}s')
@@ -0,0 +1,79 @@
+"""
+Benchmark: string round-trip vs reader-level parsing of visitor counts.
+Scales raw_data/Visitors_by_nationality.csv up by repeating its data rows
+(100x by default) and times both ways of turning the counts into Int64.
+
+Run from the repository root:
+    python benchmarks/numeric_parsing_benchmark.py [--scale 100]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from numeric_parsing import read_grouped_csv, to_nullable_int
+
+SOURCE_PATH = os.path.join('raw_data', 'Visitors_by_nationality.csv')
+
+def write_scaled_csv(path, scale):
+    """Write the source CSV with its data rows repeated ``scale`` times."""
+    with open(SOURCE_PATH) as f:
+        header = [next(f), next(f)]
+        rows = [row if row.endswith('\n') else row + '\n' for row in f]
+    with open(path, 'w') as out:
+        out.writelines(header)
+        for _ in range(scale):
+            out.writelines(rows)
+
+def parse_string_round_trip(path):
+    df = pd.read_csv(path, header=[0, 1])
+    values = df.iloc[:, 2:]
+    for col in values.columns:
+        values[col] = (
+            values[col]
+            .astype(str)
+            .str.replace(',', '', regex=False)
+            .replace({'': None, 'nan': None})
+            .astype(float)
+            .round(0)
+            .astype('Int64')
+        )
+    return values
+
+def parse_reader_thousands(path):
+    df = read_grouped_csv(path, header=[0, 1])
+    values = df.iloc[:, 2:]
+    return pd.DataFrame({col: to_nullable_int(values[col]) for col in values.columns})
+
+def best_of(func, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, default=100, help='number of copies of the data rows')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per method (best is reported)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'visitors_scaled.csv')
+        write_scaled_csv(path, args.scale)
+        size_mb = os.path.getsize(path) / 1e6
+
+        old_time, old = best_of(parse_string_round_trip, path, args.repeat)
+        new_time, new = best_of(parse_reader_thousands, path, args.repeat)
+
+    pd.testing.assert_frame_equal(old.reset_index(drop=True), new, check_names=False)
+    print(f'Input: {size_mb:.1f} MB, {len(new):,} rows x {new.shape[1]} count columns ({args.scale}x)')
+    print(f'String round-trip:  {old_time:.3f}s')
+    print(f'Reader thousands=:  {new_time:.3f}s')
+    print(f'Speedup:            {old_time / new_time:.1f}x')
@@ -0,0 +1,329 @@
+"""
+Benchmark: the visitor pipeline and chart renderers on synthetic data.
+Generates nationality CSVs scaled by rows (years of months) and columns
+(nationalities), and a synthetic municipal map scaled by polygon count, then
+times each stage separately (parse, reshape, write, load, aggregate, and draw
+and encode per chart) and records the peak RSS after it. Every scenario runs in
+a fresh process so its memory peak is its own. Results are saved as JSON;
+``--compare`` reports the stages that got slower between two result files.
+
+"draw" is the chart function minus its ``savefig`` stages (building artists
+and layout); "encode" is the ``savefig`` stages recorded by the instrumentation
+module (rasterizing and compressing the file).
+
+Run from the repository root:
+    python benchmarks/pipeline_benchmark.py --years 29 100 --countries 60 300 --municipalities 1800 20000
+    python benchmarks/pipeline_benchmark.py --race --output after.json
+    python benchmarks/pipeline_benchmark.py --compare before.json after.json
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation
+from clean_visitors_csv import parse_visitors_csv, reshape_visitors
+from dimensions import COUNTRY_REGION, MONTH_NAMES
+from visitor_data import load_visitors, write_visitor_cache
+
+CATEGORIES = ['Total', 'Tourist', 'Business', 'Others', 'Short Excursion']
+PREFECTURE_CSV_PATH = os.path.join('raw_data', 'prefecture_visit_rate_2024.csv')
+# Visitor charts timed in every visitor scenario, with the roll-ups they read
+VISITOR_CHARTS = [
+    'plot_total_visitors_growth',
+    'plot_top_countries',
+    'plot_post_covid_growth',
+    'plot_monthly_distribution_heatmap',
+    'plot_two_period_growth_comparison',
+    'plot_stacked_region_distribution',
+]
+ROLLUPS = [('year',), ('year', 'country'), ('year', 'month'), ('year', 'region')]
+# The charts' default windows reach back to 2011, and the synthetic data ends in 2024
+MIN_YEARS = 14
+
+def write_synthetic_visitors_csv(path, n_years, n_countries, end_year=2024, seed=0):
+    """Write a nationality CSV in the published wide layout ending in ``end_year``.
+
+    The real nationalities come first, then "Synthetic NNN" ones; each starts
+    reporting in a random year (earlier cells are empty), and counts follow a
+    trend with a seasonal cycle, formatted with thousands separators.
+    """
+    rng = np.random.default_rng(seed)
+    countries = (list(COUNTRY_REGION) + [f'Synthetic {i:03d}' for i in range(n_countries)])[:n_countries]
+    years = np.repeat(np.arange(end_year - n_years + 1, end_year + 1), 12)
+    months = np.tile(np.arange(12), n_years)
+    n_rows = len(years)
+
+    scale = rng.lognormal(9, 1.5, n_countries)
+    trend = np.exp(np.outer(np.arange(n_rows) / 12, rng.normal(0.04, 0.03, n_countries)))
+    season = 1 + 0.3 * np.sin(2 * np.pi * (months[:, None] / 12 + rng.random(n_countries)))
+    tourist = scale * trend * season * rng.lognormal(0, 0.1, (n_rows, n_countries))
+    parts = [tourist, 0.3 * tourist * rng.random((n_rows, n_countries)), 0.2 * tourist * rng.random((n_rows, n_countries))]
+    counts = np.stack([sum(parts)] + parts + [0.05 * tourist], axis=2).round().astype(np.int64)
+    starts = rng.integers(0, max(1, n_rows // 2), n_countries) * (rng.random(n_countries) < 0.3)
+    reported = np.arange(n_rows)[:, None] >= starts[None, :]
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['', 'Country'] + [country for country in countries for _ in CATEGORIES])
+        writer.writerow(['Year', 'Month'] + CATEGORIES * n_countries)
+        for row in range(n_rows):
+            cells = [
+                f'{value:,}' if reported[row, country] else ''
+                for country in range(n_countries) for value in counts[row, country]
+            ]
+            writer.writerow([years[row], MONTH_NAMES[months[row]]] + cells)
+    return path
+
+def synthetic_geometry(n_municipalities, names, vertices=64, bounds=(128.0, 30.0, 146.0, 46.0)):
+    """Prefecture boxes named ``names`` on a grid over ``bounds``, each split into
+    about ``n_municipalities / len(names)`` municipal boxes of ``vertices`` points.
+
+    Returns the level-1 and level-2 GeoDataFrames with the geometry cache columns.
+    """
+    import geopandas as gpd
+    import shapely
+
+    side = int(np.ceil(np.sqrt(len(names))))
+    k = max(1, int(round(np.sqrt(n_municipalities / len(names)))))
+    minx, miny, maxx, maxy = bounds
+    width, height = (maxx - minx) / side, (maxy - miny) / side
+
+    def frame(x0, y0, w, h, columns):
+        boxes = shapely.box(x0, y0, x0 + w, y0 + h)
+        boxes = shapely.segmentize(boxes, 2 * (w + h) / vertices)
+        anchors = shapely.point_on_surface(boxes)
+        centroids = shapely.centroid(boxes)
+        return gpd.GeoDataFrame({
+            **columns,
+            'centroid_x': shapely.get_x(centroids), 'centroid_y': shapely.get_y(centroids),
+            'anchor_x': shapely.get_x(anchors), 'anchor_y': shapely.get_y(anchors),
+        }, geometry=boxes, crs='EPSG:4326')
+
+    p = np.arange(len(names))
+    gid_1 = np.array([f'JPN.{i + 1}_1' for i in p])
+    px, py = minx + (p % side) * width, miny + (p // side) * height
+    prefectures = frame(px, py, width, height, {'GID_1': gid_1, 'NAME_1': list(names)})
+
+    m = np.arange(len(names) * k * k)
+    owner, cell = m // (k * k), m % (k * k)
+    municipalities = frame(
+        px[owner] + (cell % k) * width / k, py[owner] + (cell // k) * height / k, width / k, height / k,
+        {
+            'GID_1': gid_1[owner], 'NAME_1': np.asarray(names, dtype=object)[owner],
+            'GID_2': [f'JPN.{o + 1}.{c + 1}_1' for o, c in zip(owner, cell)],
+            'NAME_2': [f'Municipality {i}' for i in m],
+        },
+    )
+    return prefectures, municipalities
+
+class StageTimer:
+    """Wall time and the process's peak RSS after each named stage."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.stages[name] = {'seconds': round(seconds, 4), 'peak_rss_mb': round(instrumentation.peak_rss_mb(), 1)}
+
+    def chart(self, name, func, *args, **kwargs):
+        """Run a chart, splitting its time into draw and encode (its savefig stages)."""
+        instrumentation.drain()
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        total = time.perf_counter() - start
+        encode = sum(record['wall'] for record in instrumentation.drain() if record['stage'].endswith('savefig'))
+        self.record(f'{name}.draw', total - encode)
+        self.record(f'{name}.encode', encode)
+
+def _init_worker(output_dir):
+    import matplotlib
+    matplotlib.use('Agg')
+    import plot_config
+
+    plot_config.OUTPUT_DIR = output_dir
+    instrumentation.enable()
+
+def run_visitor_scenario(tmp, n_years, n_countries, race=False, race_formats=('gif',)):
+    """Clean, load, aggregate and chart a synthetic nationality CSV."""
+    import visualize_tourism_growth
+    from visitor_cube import VisitorCube, classified_cube
+
+    timer = StageTimer()
+    source = write_synthetic_visitors_csv(os.path.join(tmp, 'visitors.csv'), n_years, n_countries)
+    cleaned = os.path.join(tmp, 'cleaned_visitors.csv')
+    cache = os.path.join(tmp, 'cleaned_visitors.feather')
+
+    with timer.stage('parse'):
+        wide = parse_visitors_csv(source)
+    with timer.stage('reshape'):
+        tidy = reshape_visitors(wide)
+    with timer.stage('write'):
+        tidy.to_csv(cleaned, index=False)
+        write_visitor_cache(cleaned, cache)
+    del wide, tidy
+    with timer.stage('load'):
+        visitors = load_visitors(cleaned, cache)
+    with timer.stage('aggregate'):
+        cube = classified_cube(VisitorCube.from_frame(visitors))
+        for dims in ROLLUPS:
+            cube.rollup(*dims)
+    for name in VISITOR_CHARTS:
+        timer.chart(name, getattr(visualize_tourism_growth, name), cube=cube)
+    if race:
+        # Frames are drawn and piped to the encoder together, so this is one stage
+        with timer.stage('barchart_race'):
+            visualize_tourism_growth.animate_top_15_countries(cube=cube, formats=race_formats)
+
+    instrumentation.drain()
+    return {
+        'kind': 'visitors',
+        'params': {'years': n_years, 'countries': n_countries},
+        'input_mb': round(os.path.getsize(source) / 1e6, 2),
+        'rows': len(visitors),
+        'stages': timer.stages,
+        'peak_rss_mb': round(instrumentation.peak_rss_mb(), 1),
+    }
+
+def run_map_scenario(tmp, n_municipalities, n_points):
+    """Load, join and draw synthetic municipal and prefecture geometry."""
+    import geometry_cache
+    from municipal_visit_rate import create_municipal_choropleth, point_totals
+    from prefecture_visit_rate import create_prefecture_choropleth
+
+    timer = StageTimer()
+    rng = np.random.default_rng(0)
+    names = [name.replace(' Prefecture', '').replace(' prefecture', '') for name in pd.read_csv(PREFECTURE_CSV_PATH)['Prefecture']]
+    prefectures, municipalities = synthetic_geometry(n_municipalities, names)
+    geometry_cache.SHAPEFILE_PATH = os.path.join(tmp, 'missing_{level}.shp')
+    geometry_cache.GEOMETRY_CACHE_PATH = os.path.join(tmp, 'synthetic_{level}.parquet')
+    prefectures.to_parquet(geometry_cache.GEOMETRY_CACHE_PATH.format(level=1), index=False)
+    municipalities.to_parquet(geometry_cache.GEOMETRY_CACHE_PATH.format(level=2), index=False)
+    geometry_cache.load_geometry.cache_clear()
+    metrics = pd.DataFrame({'GID_2': municipalities['GID_2'], 'visits': rng.lognormal(8, 1, len(municipalities))})
+    xmin, ymin, xmax, ymax = municipalities.total_bounds
+    x, y = rng.uniform(xmin, xmax, n_points), rng.uniform(ymin, ymax, n_points)
+    del prefectures
+
+    with timer.stage('load_geometry'):
+        gdf = geometry_cache.load_geometry(2)
+        geometry_cache.load_geometry(1)
+    with timer.stage('assign_points'):
+        point_totals(gdf, x, y)
+    timer.chart('municipal_choropleth', create_municipal_choropleth, metrics=metrics, top_n=50,
+                output_path=os.path.join(tmp, 'municipal.png'))
+    timer.chart('prefecture_choropleth', create_prefecture_choropleth)
+
+    instrumentation.drain()
+    return {
+        'kind': 'map',
+        'params': {'municipalities': len(municipalities), 'points': n_points},
+        'stages': timer.stages,
+        'peak_rss_mb': round(instrumentation.peak_rss_mb(), 1),
+    }
+
+def run_scenario(func, *args, **kwargs):
+    """Run one scenario in a fresh process with its own output directory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker, initargs=(tmp,)) as pool:
+            return pool.submit(func, tmp, *args, **kwargs).result()
+
+def environment():
+    import matplotlib
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'matplotlib': matplotlib.__version__,
+    }
+
+def print_scenario(name, result):
+    print(f"\n{name} (peak RSS {result['peak_rss_mb']:.0f} MB)")
+    for stage, values in result['stages'].items():
+        print(f"  {stage:<44} {values['seconds']:>9.3f}s {values['peak_rss_mb']:>9.0f} MB")
+
+def compare(old_path, new_path, threshold):
+    """Print per-stage timings of two result files; return the number of regressions."""
+    with open(old_path) as f:
+        old = json.load(f)['scenarios']
+    with open(new_path) as f:
+        new = json.load(f)['scenarios']
+    regressions = 0
+    for name in new:
+        if name not in old:
+            continue
+        print(f'\n{name}')
+        for stage, values in new[name]['stages'].items():
+            before = old[name]['stages'].get(stage)
+            if before is None:
+                continue
+            ratio = values['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+            slower = ratio > threshold and values['seconds'] - before['seconds'] > 0.01
+            regressions += slower
+            print(f"  {stage:<44} {before['seconds']:>9.3f}s -> {values['seconds']:>9.3f}s  {ratio:5.2f}x{'  SLOWER' if slower else ''}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--years', type=int, nargs='+', default=[29], help='years of monthly rows per synthetic CSV')
+    parser.add_argument('--countries', type=int, nargs='+', default=[60], help='nationalities (column groups) per synthetic CSV')
+    parser.add_argument('--municipalities', type=int, nargs='*', default=[1800], help='synthetic municipal polygons per map scenario')
+    parser.add_argument('--points', type=int, default=100_000, help='geocoded points assigned to municipalities')
+    parser.add_argument('--race', action='store_true', help='also render the bar chart race (needs ffmpeg; slow)')
+    parser.add_argument('--race-formats', nargs='+', default=['gif'], choices=['mp4', 'gif'])
+    parser.add_argument('--output', default='pipeline_benchmark.json', help='JSON results file')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    if min(args.years) < MIN_YEARS:
+        parser.error(f'--years must be at least {MIN_YEARS} so every chart window has data')
+    if args.compare:
+        regressions = compare(*args.compare, args.threshold)
+        print(f'\n{regressions} stage(s) slower than {args.threshold}x')
+        sys.exit(1 if regressions else 0)
+
+    results = {'environment': environment(), 'scenarios': {}}
+    for n_years in args.years:
+        for n_countries in args.countries:
+            name = f'visitors-{n_years}y-{n_countries}c'
+            results['scenarios'][name] = run_scenario(run_visitor_scenario, n_years, n_countries,
+                                                      args.race, tuple(args.race_formats))
+            print_scenario(name, results['scenarios'][name])
+    for n_municipalities in args.municipalities:
+        name = f'map-{n_municipalities}m'
+        results['scenarios'][name] = run_scenario(run_map_scenario, n_municipalities, args.points)
+        print_scenario(name, results['scenarios'][name])
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'\nResults written to {args.output}')
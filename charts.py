@@ -0,0 +1,72 @@
+"""
+Single entry point to the Japan Tourism charts.
+Chart functions are resolved lazily: ``from charts import plot_top_countries``
+only records where the function lives, and its module (pandas, matplotlib, the
+visitor data) is imported on the first call. Importing this module or any chart
+from it has no side effects.
+
+Usage:
+    from charts import plot_top_countries, create_prefecture_choropleth
+    plot_top_countries()
+"""
+
+import functools
+import importlib
+import os
+
+# Chart function -> module defining it
+CHARTS = {
+    'plot_total_visitors_growth': 'visualize_tourism_growth',
+    'plot_top_countries': 'visualize_tourism_growth',
+    'plot_post_covid_growth': 'visualize_tourism_growth',
+    'plot_monthly_distribution_heatmap': 'visualize_tourism_growth',
+    'animate_top_15_countries': 'visualize_tourism_growth',
+    'plot_two_period_growth_comparison': 'visualize_tourism_growth',
+    'plot_stacked_region_distribution': 'visualize_tourism_growth',
+    'plot_country_trends': 'visualize_tourism_growth',
+    'plot_travel_costs': 'travel_costs',
+    'plot_total_yearly_spend': 'travel_costs',
+    'plot_anime_market': 'cultural_exports',
+    'plot_manga_market': 'cultural_exports',
+    'plot_sushi_restaurants': 'cultural_exports',
+    'plot_visit_motivation': 'visit_motivation',
+    'create_prefecture_choropleth': 'prefecture_visit_rate',
+    'create_municipal_choropleth': 'municipal_visit_rate',
+}
+
+__all__ = sorted(CHARTS)
+
+class LazyChart:
+    """Callable stand-in for a chart function that imports its module on first use."""
+
+    def __init__(self, name, module):
+        self.__name__ = name
+        self.__module__ = module
+        self._func = None
+
+    def load(self):
+        """Import the chart's module and return the real function."""
+        if self._func is None:
+            self._func = getattr(importlib.import_module(self.__module__), self.__name__)
+            functools.update_wrapper(self, self._func)
+        return self._func
+
+    def __call__(self, *args, **kwargs):
+        import plot_config
+        os.makedirs(plot_config.OUTPUT_DIR, exist_ok=True)
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<chart {self.__module__}.{self.__name__}>'
+
+@functools.lru_cache(maxsize=None)
+def _chart(name):
+    return LazyChart(name, CHARTS[name])
+
+def __getattr__(name):
+    if name in CHARTS:
+        return _chart(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + list(CHARTS))
@@ -1,38 +1,27 @@
-import pandas as pd
-
-# Country to region mapping (add more as needed)
-country_region = {
-    # Asia
-    'Korea': 'Asia', 'China': 'Asia', 'Taiwan': 'Asia', 'Hong Kong': 'Asia', 'Thailand': 'Asia', 'Singapore': 'Asia', 'Malaysia': 'Asia', 'Indonesia': 'Asia', 'Philippines': 'Asia', 'Vietnam': 'Asia', 'India': 'Asia', 'Middle East': 'Asia', 'Israel': 'Asia', 'Turkey': 'Asia', 'GCC': 'Asia', 'Macau': 'Asia', 'Mongolia': 'Asia', 'Asia Unclassified': 'Asia',
-    # Europe
-    'United Kingdom': 'Europe', 'France': 'Europe', 'Germany': 'Europe', 'Italy': 'Europe', 'Russia': 'Europe', 'Spain': 'Europe', 'Sweden': 'Europe', 'Netherland': 'Europe', 'Swiss': 'Europe', 'Belgium': 'Europe', 'Finland': 'Europe', 'Poland': 'Europe', 'Denmark': 'Europe', 'Norway': 'Europe', 'Austria': 'Europe', 'Portugal': 'Europe', 'Ireland': 'Europe', 'Europe Unclassified': 'Europe',
-    # Africa
-    'Africa': 'Africa',
-    # North America
-    'U.S.A.': 'North America', 'Canada': 'North America', 'Mexico': 'North America', 'North America Unclassified': 'North America',
-    # South America
-    'Brazil': 'South America', 'South America Unclassified': 'South America',
-    # Oceania
-    'Australia': 'Oceania', 'New Zealand': 'Oceania', 'Oceania Unclassified': 'Oceania',
-}
+import argparse
+import csv
+import hashlib
+import json
+import os
 
-def get_region(country):
-    return country_region.get(country, 'Other')
-
-# Read the CSV with multi-level columns (first row: country, second row: category)
-df = pd.read_csv('raw_data/Visitors_by_nationality.csv', header=[0, 1])
+import numpy as np
+import pandas as pd
 
-# Use the actual column names from the CSV
-id_vars = [('Unnamed: 0_level_0', 'Year'), ('Country', 'Month')]
-value_vars = [col for col in df.columns if col not in id_vars]
+from dimensions import COUNTRY_REGION, MONTH_DTYPE, MONTH_NAMES, assign_regions, region_of
+from instrumentation import stage
+from numeric_parsing import read_grouped_csv, to_nullable_int
+from visitor_data import CLEANED_CACHE_PATH, cache_is_fresh, update_visitor_cache, write_visitor_cache
 
-df_long = df.melt(id_vars=id_vars, value_vars=value_vars, var_name=['country', 'category'], value_name='visitors')
+# Kept for scripts that import the mapping from here; the tables live in dimensions
+country_region = COUNTRY_REGION
+get_region = region_of
 
-# Pivot so each row is year, month, country, and columns for each category
-df_pivot = df_long.pivot_table(index=[('Unnamed: 0_level_0', 'Year'), ('Country', 'Month'), 'country'], columns='category', values='visitors', aggfunc='first').reset_index()
+INPUT_PATH = 'raw_data/Visitors_by_nationality.csv'
+OUTPUT_PATH = 'raw_data/cleaned_visitors.csv'
+# Watermark, per-month checksums and year offsets of the incremental ingest
+INGEST_STATE_PATH = 'raw_data/cleaned_visitors.ingest.json'
 
 # Rename columns to match the required output
-df_pivot.columns.name = None
 column_map = {
     ('Unnamed: 0_level_0', 'Year'): 'year',
     ('Country', 'Month'): 'month',
@@ -43,29 +32,250 @@ column_map = {
     'Others': 'others',
     'Short Excursion': 'short_excursion',
 }
-df_pivot = df_pivot.rename(columns=column_map)
-
-# Add region column after country
-regions = df_pivot['country'].apply(get_region)
-df_pivot.insert(df_pivot.columns.get_loc('country') + 1, 'region', regions)
-
-# Reorder columns
-final_columns = ['year', 'month', 'country', 'region', 'total', 'tourist', 'business', 'others', 'short_excursion']
-df_pivot = df_pivot[final_columns]
-
-# Clean up the numeric columns: remove commas, convert to int, handle missing values
-for col in ['total', 'tourist', 'business', 'others', 'short_excursion']:
-    df_pivot[col] = (
-        df_pivot[col]
-        .astype(str)
-        .str.replace(',', '', regex=False)
-        .replace({'': None, 'nan': None})
-        .astype(float)
-        .round(0)
-        .astype('Int64')
-    )
-
-# Write to CSV
-df_pivot.to_csv('raw_data/cleaned_visitors.csv', index=False)
-
-print('Cleaned data written to raw_data/cleaned_visitors.csv') 
\ No newline at end of file
+numeric_columns = ['total', 'tourist', 'business', 'others', 'short_excursion']
+final_columns = ['year', 'month', 'country', 'region'] + numeric_columns
+
+@stage('parse_visitors_csv')
+def parse_visitors_csv(input_path=INPUT_PATH):
+    """Read the wide nationality CSV with its (country, category) column header."""
+    # Read the CSV with multi-level columns (first row: country, second row: category)
+    return read_grouped_csv(input_path, header=[0, 1])
+
+@stage('reshape_visitors')
+def reshape_visitors(df):
+    """Turn the wide nationality table into one row per year, month and country."""
+    # Use the actual column names from the CSV
+    id_vars = [('Unnamed: 0_level_0', 'Year'), ('Country', 'Month')]
+    value_vars = [col for col in df.columns if col not in id_vars]
+
+    df_long = df.melt(id_vars=id_vars, value_vars=value_vars, var_name=['country', 'category'], value_name='visitors')
+
+    # Pivot so each row is year, month, country, and columns for each category
+    df_pivot = df_long.pivot_table(index=[('Unnamed: 0_level_0', 'Year'), ('Country', 'Month'), 'country'], columns='category', values='visitors', aggfunc='first').reset_index()
+
+    df_pivot.columns.name = None
+    df_pivot = df_pivot.rename(columns=column_map)
+
+    # Country and month as categorical codes; regions are looked up once per country code
+    df_pivot['country'] = df_pivot['country'].astype('category')
+    df_pivot['month'] = df_pivot['month'].astype(MONTH_DTYPE)
+    df_pivot.insert(df_pivot.columns.get_loc('country') + 1, 'region', assign_regions(df_pivot['country']))
+
+    # Reorder columns
+    df_pivot = df_pivot[final_columns]
+
+    # Counts were parsed by the reader; convert to nullable ints
+    for col in numeric_columns:
+        df_pivot[col] = to_nullable_int(df_pivot[col])
+    return df_pivot
+
+def clean_visitors(input_path=INPUT_PATH, output_path=OUTPUT_PATH):
+    """Reshape the whole nationality CSV in memory and write the tidy CSV."""
+    df = reshape_visitors(parse_visitors_csv(input_path))
+    with stage('write_cleaned_csv'):
+        df.to_csv(output_path, index=False)
+
+def _year_blocks(input_path, chunksize=120, start_row=0):
+    """Yield (year, tidy rows) for every year of the nationality CSV, in file order.
+
+    Rows are sorted as in ``clean_visitors``. Reading starts at data row
+    ``start_row`` (0 is the first row after the two header rows), which must
+    be the first row of a year. The input must be ordered by year.
+    """
+    # Read the two header rows once: country names, then categories
+    with open(input_path, newline='') as f:
+        reader = csv.reader(f)
+        header_countries = next(reader)[2:]
+        header_categories = next(reader)[2:]
+
+    # Map every (country, category) pair to its position in the data columns;
+    # missing categories point at a trailing all-NaN column
+    countries = list(dict.fromkeys(header_countries))
+    country_pos = {country: i for i, country in enumerate(countries)}
+    missing = len(header_countries)
+    positions = np.full((len(countries), len(numeric_columns)), missing)
+    for pos, (country, category) in enumerate(zip(header_countries, header_categories)):
+        k = numeric_columns.index(column_map[category])
+        if positions[country_pos[country], k] == missing:
+            positions[country_pos[country], k] = pos
+    countries = np.array(countries, dtype=object)
+    regions = np.array([region_of(c) for c in countries], dtype=object)
+
+    def sorted_years(frame):
+        for year in pd.unique(frame['year']):
+            yield year, frame[frame['year'] == year].sort_values(['year', 'month', 'country'])
+
+    pending = None
+    last_year = None
+    dtypes = {0: str, 1: str, **{pos: float for pos in range(2, missing + 2)}}
+    chunks = read_grouped_csv(input_path, header=None, skiprows=2 + start_row, dtype=dtypes, chunksize=chunksize)
+    for chunk in chunks:
+        years = chunk.iloc[:, 0].astype(int).to_numpy()
+        if (last_year is not None and years[0] < last_year) or (np.diff(years) < 0).any():
+            raise ValueError(f'{input_path} is not ordered by year; use the in-memory cleaner instead')
+        last_year = years[-1]
+        months = chunk.iloc[:, 1].to_numpy(dtype=object)
+
+        values = chunk.iloc[:, 2:].to_numpy(dtype=float)
+        values = np.concatenate([values, np.full((len(values), 1), np.nan)], axis=1)
+
+        # (row, country, category) cube; drop rows with no figures at all
+        cube = values[:, positions]
+        row_idx, country_idx = np.nonzero(~np.isnan(cube).all(axis=2))
+        frame = pd.DataFrame({
+            'year': years[row_idx],
+            'month': months[row_idx],
+            'country': countries[country_idx],
+            'region': regions[country_idx],
+        })
+        for k, col in enumerate(numeric_columns):
+            frame[col] = to_nullable_int(cube[row_idx, country_idx, k])
+
+        # Emit every year that is complete; keep the latest one pending
+        if pending is not None:
+            frame = pd.concat([pending, frame], ignore_index=True)
+        done = frame['year'] != last_year
+        if done.any():
+            yield from sorted_years(frame[done])
+        pending = frame[~done]
+    if pending is not None and len(pending):
+        yield from sorted_years(pending)
+
+def _write_years(blocks, out):
+    """Write tidy year blocks to ``out``; returns {year: offset of its first row}."""
+    offsets = {}
+    for year, block in blocks:
+        offsets[str(year)] = out.tell()
+        block.to_csv(out, header=False, index=False)
+    return offsets
+
+@stage('clean_visitors_streaming')
+def clean_visitors_streaming(input_path=INPUT_PATH, output_path=OUTPUT_PATH, chunksize=120):
+    """Reshape the nationality CSV chunk by chunk, appending to the tidy CSV.
+
+    Only ``chunksize`` data rows plus the rows of the year being assembled are
+    held in memory, and the output is byte-identical to ``clean_visitors``.
+    The input must be ordered by year, as the published file is. Returns the
+    offset of each year's first row in the output.
+    """
+    with open(output_path, 'w', newline='') as out:
+        out.write(','.join(final_columns) + '\n')
+        return _write_years(_year_blocks(input_path, chunksize), out)
+
+def period_checksums(input_path=INPUT_PATH):
+    """Checksum of the header and of every (year, month) row of the nationality CSV.
+
+    Returns (header checksum, [(year, month number, checksum), ...]) in file order.
+    """
+    # Rows are hashed as raw bytes; only the year and month fields are split off
+    months = {name.encode(): number for number, name in enumerate(MONTH_NAMES, 1)}
+    with open(input_path, 'rb') as f:
+        header = hashlib.sha1(next(f).rstrip(b'\r\n') + b'\n' + next(f).rstrip(b'\r\n')).hexdigest()
+        periods = []
+        for line in f:
+            line = line.rstrip(b'\r\n')
+            if not line:
+                continue
+            year, month, _ = line.split(b',', 2)
+            periods.append((int(year), months[month], hashlib.sha1(line).hexdigest()))
+    return header, periods
+
+def _load_ingest_state(state_path):
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path) as f:
+        return json.load(f)
+
+@stage('ingest_visitors')
+def ingest_visitors(input_path=INPUT_PATH, output_path=OUTPUT_PATH, state_path=INGEST_STATE_PATH, chunksize=120):
+    """Bring the tidy CSV up to date with a new release of the nationality CSV.
+
+    The state file keeps the watermark (last year and month ingested), a
+    checksum per (year, month) and the offset of every year in the tidy CSV.
+    Months after the watermark are new; earlier months whose checksum changed
+    are restated. The tidy CSV is truncated at the first affected year and
+    only the rows from there on are reshaped and written, so a monthly
+    release costs one year of reshaping instead of the whole history, and the
+    result is byte-identical to a full clean. Without a state file (or when
+    the country columns change) everything is rebuilt.
+
+    Returns a summary with the mode ('full', 'delta' or 'current'), the new
+    and restated periods, the years rewritten and, for a delta, the offset in
+    the tidy CSV from which they were rewritten (see
+    visitor_data.update_visitor_cache for bringing the Feather copy along).
+    """
+    header, periods = period_checksums(input_path)
+    state = _load_ingest_state(state_path)
+    summary = {'new': [], 'restated': [], 'years': []}
+
+    if state is None or state['header'] != header or not os.path.exists(output_path):
+        summary['mode'] = 'full'
+        offsets = clean_visitors_streaming(input_path, output_path, chunksize)
+        summary['new'] = [f'{year}-{month:02d}' for year, month, _ in periods]
+        summary['years'] = sorted({year for year, _, _ in periods})
+    else:
+        known = state['periods']
+        watermark = tuple(state['watermark'])
+        for year, month, checksum in periods:
+            key = f'{year}-{month:02d}'
+            if (year, month) > watermark or key not in known:
+                summary['new'].append(key)
+            elif known[key] != checksum:
+                summary['restated'].append(key)
+        current = {f'{year}-{month:02d}' for year, month, _ in periods}
+        # Months dropped from the release count as restated
+        summary['restated'] += sorted(set(known) - current)
+        affected = summary['new'] + summary['restated']
+        if not affected:
+            summary['mode'] = 'current'
+            return summary
+
+        summary['mode'] = 'delta'
+        first_year = min(int(key[:4]) for key in affected)
+        start_row = next(i for i, (year, _, _) in enumerate(periods) if year >= first_year)
+        offsets = {year: offset for year, offset in state['offsets'].items() if int(year) < first_year}
+        summary['offset'] = state['offsets'].get(str(first_year), os.path.getsize(output_path))
+        with open(output_path, 'r+', newline='') as out:
+            out.seek(summary['offset'])
+            out.truncate()
+            offsets.update(_write_years(_year_blocks(input_path, chunksize, start_row), out))
+        summary['years'] = sorted({year for year, _, _ in periods[start_row:]})
+
+    state = {
+        'header': header,
+        'watermark': list(max((year, month) for year, month, _ in periods)),
+        'periods': {f'{year}-{month:02d}': checksum for year, month, checksum in periods},
+        'offsets': offsets,
+    }
+    with open(state_path, 'w') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Clean the visitors-by-nationality CSV.')
+    parser.add_argument('--stream', action='store_true', help='process rows in bounded chunks')
+    parser.add_argument('--chunksize', type=int, default=120, help='data rows per chunk in streaming mode')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only reshape months after the last ingest (and restated ones)')
+    args = parser.parse_args()
+
+    if args.incremental:
+        # Only a cache in step with the CSV before the ingest can be patched
+        patch_cache = cache_is_fresh(OUTPUT_PATH, CLEANED_CACHE_PATH)
+        summary = ingest_visitors(chunksize=args.chunksize)
+        print(f"{summary['mode']} ingest: {len(summary['new'])} new and {len(summary['restated'])} restated month(s)"
+              + (f", years {summary['years'][0]}-{summary['years'][-1]} rewritten" if summary['years'] else ''))
+        if summary['restated']:
+            print(f"Restated: {', '.join(summary['restated'])}")
+        if summary['mode'] == 'current':
+            raise SystemExit(0)
+    elif args.stream:
+        clean_visitors_streaming(chunksize=args.chunksize)
+    else:
+        clean_visitors()
+    if args.incremental and summary['mode'] == 'delta' and patch_cache:
+        update_visitor_cache(summary['years'][0], summary['offset'], OUTPUT_PATH, CLEANED_CACHE_PATH)
+    else:
+        write_visitor_cache(OUTPUT_PATH, CLEANED_CACHE_PATH)
+
+    print(f'Cleaned data written to {OUTPUT_PATH} and {CLEANED_CACHE_PATH}')
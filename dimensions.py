@@ -0,0 +1,86 @@
+"""
+Shared dimension tables for the visitor data.
+Countries, regions and months are kept as pandas categoricals: one small
+integer code per row plus a table of labels. Attributes of a label (a
+country's region, whether it is an "Unclassified" catch-all, a month's
+abbreviation) are computed once per category and broadcast through the codes,
+so mapping or filtering a column costs one array lookup instead of a string
+operation on every row.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Country to region mapping (add more as needed)
+COUNTRY_REGION = {
+    # Asia
+    'Korea': 'Asia', 'China': 'Asia', 'Taiwan': 'Asia', 'Hong Kong': 'Asia', 'Thailand': 'Asia', 'Singapore': 'Asia', 'Malaysia': 'Asia', 'Indonesia': 'Asia', 'Philippines': 'Asia', 'Vietnam': 'Asia', 'India': 'Asia', 'Middle East': 'Asia', 'Israel': 'Asia', 'Turkey': 'Asia', 'GCC': 'Asia', 'Macau': 'Asia', 'Mongolia': 'Asia', 'Asia Unclassified': 'Asia',
+    # Europe
+    'United Kingdom': 'Europe', 'France': 'Europe', 'Germany': 'Europe', 'Italy': 'Europe', 'Russia': 'Europe', 'Spain': 'Europe', 'Sweden': 'Europe', 'Netherland': 'Europe', 'Swiss': 'Europe', 'Belgium': 'Europe', 'Finland': 'Europe', 'Poland': 'Europe', 'Denmark': 'Europe', 'Norway': 'Europe', 'Austria': 'Europe', 'Portugal': 'Europe', 'Ireland': 'Europe', 'Europe Unclassified': 'Europe',
+    # Africa
+    'Africa': 'Africa',
+    # North America
+    'U.S.A.': 'North America', 'Canada': 'North America', 'Mexico': 'North America', 'North America Unclassified': 'North America',
+    # South America
+    'Brazil': 'South America', 'South America Unclassified': 'South America',
+    # Oceania
+    'Australia': 'Oceania', 'New Zealand': 'Oceania', 'Oceania Unclassified': 'Oceania',
+}
+# Region of countries missing from COUNTRY_REGION
+OTHER_REGION = 'Other'
+# Marker of the catch-all "<region> Unclassified" countries
+UNCLASSIFIED = 'Unclassified'
+
+MONTH_NAMES = [
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+]
+MONTH_ABBREVIATIONS = [name[:3] for name in MONTH_NAMES]
+MONTH_DTYPE = pd.CategoricalDtype(MONTH_NAMES, ordered=True)
+
+def region_of(country):
+    return COUNTRY_REGION.get(country, OTHER_REGION)
+
+def is_unclassified_name(country):
+    return isinstance(country, str) and UNCLASSIFIED in country
+
+def as_categorical(values):
+    """``values`` (Series, Index or array) as a pandas Categorical; categoricals pass through."""
+    if isinstance(values, pd.Series):
+        values = values.array
+    if isinstance(values, pd.CategoricalIndex):
+        values = values.array
+    if isinstance(values, pd.Categorical):
+        return values
+    return pd.Categorical(values)
+
+def category_mask(values, predicate):
+    """Boolean array: ``predicate(label)`` for each value, evaluated once per category (missing -> False)."""
+    values = as_categorical(values)
+    table = np.append([bool(predicate(label)) for label in values.categories], False)
+    return table[values.codes]
+
+def relabel(values, func, categories=None, ordered=False):
+    """Categorical of ``func(label)`` for each value, evaluated once per category.
+
+    ``categories`` fixes the result's label table (labels outside it become
+    missing); by default it is the sorted set of mapped labels.
+    """
+    values = as_categorical(values)
+    labels = [func(label) for label in values.categories]
+    if categories is None:
+        categories = sorted(set(labels))
+    lookup = np.append(pd.Index(categories).get_indexer(labels), -1)
+    return pd.Categorical.from_codes(lookup[values.codes], categories=categories, ordered=ordered)
+
+def assign_regions(countries):
+    """Region of every country as a Categorical."""
+    return relabel(countries, region_of)
+
+def unclassified_mask(countries):
+    """True for the "<region> Unclassified" catch-all countries."""
+    return category_mask(countries, is_unclassified_name)
+
+def month_abbreviations(months):
+    """Months ('January' or 'Jan') as an ordered Categorical of 'Jan'..'Dec'."""
+    return relabel(months, lambda month: str(month)[:3], MONTH_ABBREVIATIONS, ordered=True)
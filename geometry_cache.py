@@ -0,0 +1,81 @@
+"""
+Preprocessed GADM boundaries for the Japan maps.
+Polygons are simplified to the resolution of the rendered map, centroids and
+label anchors are precomputed, and the result is stored as GeoParquet next to
+the shapefile; maps load that copy whenever it is newer than the shapefile.
+
+Run from the repository root to rebuild the caches:
+    python geometry_cache.py [--level 1 2]
+"""
+
+import argparse
+import os
+from functools import lru_cache
+
+from instrumentation import stage
+from plot_config import STANDARD_FIGURE_CONFIG
+from visitor_data import cache_is_fresh
+
+SHAPEFILE_PATH = os.path.join('shapefiles', 'gadm41_JPN_{level}.shp')
+GEOMETRY_CACHE_PATH = os.path.join('shapefiles', 'gadm41_JPN_{level}.parquet')
+
+# Width of the rendered maps in inches; with the output dpi this fixes the
+# size of one pixel on the ground and so how much detail is worth keeping
+MAP_INCHES = 12
+# Attribute columns kept per level (everything else in the DBF is dropped)
+LEVEL_COLUMNS = {
+    1: ['GID_1', 'NAME_1'],
+    2: ['GID_1', 'NAME_1', 'GID_2', 'NAME_2'],
+}
+
+def map_tolerance(bounds, inches=MAP_INCHES, dpi=STANDARD_FIGURE_CONFIG['dpi']):
+    """Half a pixel in map units for a map of ``bounds`` drawn ``inches`` wide at ``dpi``."""
+    minx, miny, maxx, maxy = bounds
+    return max(maxx - minx, maxy - miny) / (inches * dpi) / 2
+
+def build_geometry_cache(level=1, shapefile_path=None, cache_path=None, tolerance=None):
+    """Simplify one GADM level, add centroid/anchor columns and write it as GeoParquet."""
+    import geopandas as gpd
+
+    shapefile_path = shapefile_path or SHAPEFILE_PATH.format(level=level)
+    cache_path = cache_path or GEOMETRY_CACHE_PATH.format(level=level)
+    with stage('read_shapefile'):
+        gdf = gpd.read_file(shapefile_path)
+    gdf = gdf[LEVEL_COLUMNS[level] + ['geometry']]
+    if tolerance is None:
+        tolerance = map_tolerance(gdf.total_bounds)
+
+    # Centroids come from the full-resolution polygons; anchors are guaranteed
+    # to fall inside the (possibly concave or multi-part) shape
+    centroids = gdf.geometry.centroid
+    anchors = gdf.geometry.representative_point()
+    gdf['centroid_x'], gdf['centroid_y'] = centroids.x, centroids.y
+    gdf['anchor_x'], gdf['anchor_y'] = anchors.x, anchors.y
+    with stage('simplify_geometry'):
+        gdf['geometry'] = gdf.geometry.simplify(tolerance, preserve_topology=True)
+    gdf.to_parquet(cache_path, index=False)
+    return cache_path
+
+@lru_cache(maxsize=None)
+def load_geometry(level=1, shapefile_path=None, cache_path=None):
+    """Simplified boundaries for a GADM level, rebuilding the cache if it is stale.
+
+    Cached per process, so callers must not modify the result in place.
+    """
+    import geopandas as gpd
+
+    shapefile_path = shapefile_path or SHAPEFILE_PATH.format(level=level)
+    cache_path = cache_path or GEOMETRY_CACHE_PATH.format(level=level)
+    if not cache_is_fresh(shapefile_path, cache_path):
+        build_geometry_cache(level, shapefile_path, cache_path)
+    with stage('read_geoparquet'):
+        return gpd.read_parquet(cache_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the simplified GADM geometry caches.')
+    parser.add_argument('--level', type=int, nargs='+', choices=sorted(LEVEL_COLUMNS), default=[1, 2],
+                        help='GADM levels to build (default: 1 2)')
+    args = parser.parse_args()
+
+    for level in args.level:
+        print(f'Geometry cache written to {build_geometry_cache(level)}')
@@ -0,0 +1,93 @@
+"""
+Growth analytics over an entity x year matrix.
+Long tables (one row per entity and year) and cube roll-ups are pivoted once
+into a dense float matrix with NaN for missing years; period-over-period,
+compound annual (CAGR) and year-over-year growth are then whole-array
+expressions, so every entity and every pair of years is computed at once
+instead of filtering the table per cell.
+"""
+
+import numpy as np
+import pandas as pd
+
+class GrowthMatrix:
+    """Values per entity (rows) and year (columns), NaN where a year is missing."""
+
+    def __init__(self, entities, years, values):
+        self.entities = pd.Index(entities)
+        self.years = np.asarray(years, dtype=int)
+        self.values = np.asarray(values, dtype=float)
+
+    @classmethod
+    def from_long(cls, df, entity, year, value):
+        """Pivot rows of (``entity``, ``year``, ``value``) into the matrix.
+
+        Entities keep their order of first appearance and years are sorted;
+        duplicate (entity, year) rows are summed.
+        """
+        entity_codes, entities = pd.factorize(df[entity], sort=False)
+        year_codes, years = pd.factorize(df[year], sort=True)
+        valid = (entity_codes >= 0) & (year_codes >= 0)
+        shape = (len(entities), len(years))
+        cells = entity_codes[valid] * shape[1] + year_codes[valid]
+        totals = np.bincount(cells, weights=df[value].to_numpy(dtype=float)[valid], minlength=shape[0] * shape[1])
+        present = np.bincount(cells, minlength=shape[0] * shape[1]) > 0
+        return cls(pd.Index(entities, name=entity), years, np.where(present, totals, np.nan).reshape(shape))
+
+    @classmethod
+    def from_rollup(cls, series):
+        """Matrix from a roll-up Series indexed by ``year`` and one entity level,
+        e.g. ``cube.rollup('year', 'country')['tourist']``."""
+        table = series.unstack('year')
+        return cls(table.index, table.columns, table.to_numpy(dtype=float))
+
+    def column(self, year):
+        """Values of every entity in ``year``."""
+        position = np.searchsorted(self.years, year)
+        if position == len(self.years) or self.years[position] != year:
+            raise KeyError(f'No data for year {year}')
+        return self.values[:, position]
+
+    def present(self, *years):
+        """Mask of the entities with a value in every one of ``years``."""
+        return np.logical_and.reduce([~np.isnan(self.column(year)) for year in years])
+
+    def period_growth(self, base, target):
+        """Percentage change from ``base`` to ``target`` per entity."""
+        start, end = self.column(base), self.column(target)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return ((end - start) / start) * 100
+
+    def cagr(self, base, target):
+        """Compound annual growth rate (%) from ``base`` to ``target`` per entity."""
+        start, end = self.column(base), self.column(target)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (np.power(end / start, 1 / (target - base)) - 1) * 100
+
+    def yoy(self):
+        """Year-over-year growth (%) per entity and year; NaN where the previous year has no column."""
+        previous = np.searchsorted(self.years, self.years - 1)
+        has_previous = np.zeros(len(self.years), dtype=bool)
+        inside = previous < len(self.years)
+        has_previous[inside] = self.years[previous[inside]] == self.years[inside] - 1
+        growth = np.full(self.values.shape, np.nan)
+        start = self.values[:, previous[has_previous]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth[:, has_previous] = ((self.values[:, has_previous] - start) / start) * 100
+        return growth
+
+    def pairwise_growth(self, annualized=False):
+        """Growth (%) for every pair of years as an entity x base x target array.
+
+        ``annualized`` gives the CAGR instead; pairs with target <= base are NaN then.
+        """
+        start = self.values[:, :, None]
+        end = self.values[:, None, :]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if not annualized:
+                return ((end - start) / start) * 100
+            span = (self.years[None, :] - self.years[:, None]).astype(float)
+            growth = (np.power(end / start, 1 / span[None, :, :]) - 1) * 100
+        # np.power(1, nan) is 1, so NaN spans alone would leave 0% on the diagonal
+        growth[:, span <= 0] = np.nan
+        return growth
@@ -0,0 +1,110 @@
+"""
+Share heatmaps that scale to large seasonality matrices.
+Shares (each cell as a % of its row total) are computed from categorical
+codes with one ``np.bincount`` into a rows x columns array, so a country x
+week or country x day matrix costs the same as year x month. Heatmaps are one
+``imshow`` image instead of a mesh of per-cell patches; matrices with more
+cells than ``max_shape`` are averaged over blocks of cells first, and tick
+labels are thinned to at most ``MAX_TICKS`` per axis. Heatmaps with the same
+layout share one figure template (axes, image, colorbar and colormap), so a
+figure per country only swaps the image data.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from plot_config import STANDARD_TITLE_CONFIG, figure_template, tight_layout
+
+HEATMAP_COLOR = '#2066a8'
+MAX_TICKS = 40
+
+def share_matrix(row_codes, col_codes, values, shape):
+    """``values`` summed into a ``shape`` (rows x columns) array by their codes, as % of each row's total.
+
+    Codes are integer positions (e.g. ``Categorical.codes``); negative codes
+    are skipped. Cells without data, and rows with a zero total, are NaN.
+    """
+    row_codes, col_codes = np.asarray(row_codes), np.asarray(col_codes)
+    values = np.asarray(values, dtype=float)
+    valid = (row_codes >= 0) & (col_codes >= 0) & ~np.isnan(values)
+    cells = row_codes[valid] * shape[1] + col_codes[valid]
+    sums = np.bincount(cells, weights=values[valid], minlength=shape[0] * shape[1]).reshape(shape)
+    observed = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape) > 0
+    totals = sums.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(observed & (totals > 0), sums / totals * 100, np.nan)
+
+def block_shape(shape, max_shape=None):
+    """Cells per block along each axis so that ``shape`` fits in ``max_shape`` (1 x 1 if it already does)."""
+    if max_shape is None:
+        return (1, 1)
+    return tuple(max(1, -(-n // limit)) for n, limit in zip(shape, max_shape))
+
+def downsample(matrix, block):
+    """Mean of every ``block`` (rows, columns) of cells, ignoring NaN; edge blocks may be partial."""
+    if tuple(block) == (1, 1):
+        return matrix
+    rows, cols = matrix.shape
+    padded = np.full((-(-rows // block[0]) * block[0], -(-cols // block[1]) * block[1]), np.nan)
+    padded[:rows, :cols] = matrix
+    blocks = padded.reshape(padded.shape[0] // block[0], block[0], padded.shape[1] // block[1], block[1])
+    with np.errstate(invalid='ignore'):
+        counts = (~np.isnan(blocks)).sum(axis=(1, 3))
+        return np.where(counts > 0, np.nansum(blocks, axis=(1, 3)) / counts, np.nan)
+
+def _ticks(labels):
+    """Tick positions and labels, thinned to at most MAX_TICKS."""
+    step = max(1, -(-len(labels) // MAX_TICKS))
+    positions = np.arange(0, len(labels), step)
+    return positions, [str(labels[i]) for i in positions]
+
+@lru_cache(maxsize=None)
+def share_cmap(color=HEATMAP_COLOR):
+    """Light-to-``color`` colormap, built once per process."""
+    import seaborn as sns
+    return sns.light_palette(color, as_cmap=True)
+
+def heatmap_template(row_labels, col_labels, figsize=(14, 12), xlabel=None, ylabel=None, cbar_label=None,
+                     cell_edges=0.0, key='heatmap'):
+    """Figure template holding one heatmap image of len(row_labels) x len(col_labels) cells.
+
+    ``cell_edges`` (a line width) separates the cells with white lines, drawn
+    as two grids rather than per-cell edges. Templates are shared by every
+    heatmap with the same layout; returns the FigureTemplate (artists: the image).
+    """
+    row_labels, col_labels = tuple(map(str, row_labels)), tuple(map(str, col_labels))
+
+    def build(ax):
+        image = ax.imshow(np.zeros((len(row_labels), len(col_labels))), aspect='auto', interpolation='nearest',
+                          cmap=share_cmap())
+        colorbar = ax.figure.colorbar(image, ax=ax, label=cbar_label)
+        colorbar.outline.set_visible(False)
+        for spine in ax.spines.values():
+            spine.set_visible(False)
+        ax.set_xticks(*_ticks(col_labels))
+        ax.set_yticks(*_ticks(row_labels))
+        if cell_edges:
+            ax.set_xticks(np.arange(len(col_labels) + 1) - 0.5, minor=True)
+            ax.set_yticks(np.arange(len(row_labels) + 1) - 0.5, minor=True)
+            ax.grid(which='minor', color='white', linewidth=cell_edges, linestyle='-', alpha=1)
+            ax.tick_params(which='minor', length=0)
+        return image
+    return figure_template((key, row_labels, col_labels, figsize, xlabel, ylabel, cbar_label, cell_edges), build, figsize,
+                           xlabel=xlabel, ylabel=ylabel)
+
+def draw_heatmap(matrix, row_labels, col_labels, title, max_shape=None, **template_kwargs):
+    """Heatmap of ``matrix`` on its shared template, averaged over blocks to fit ``max_shape``; returns the figure.
+
+    Blocks are labelled by their first row/column label.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    block = block_shape(matrix.shape, max_shape)
+    matrix = downsample(matrix, block)
+    template = heatmap_template(list(row_labels)[::block[0]], list(col_labels)[::block[1]], **template_kwargs)
+    template.artists.set_data(matrix)
+    if np.isfinite(matrix).any():
+        template.artists.set_clim(np.nanmin(matrix), np.nanmax(matrix))
+    template.ax.set_title(title, **STANDARD_TITLE_CONFIG)
+    tight_layout(template.fig)
+    return template.fig
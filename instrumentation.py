@@ -0,0 +1,146 @@
+"""
+Timing instrumentation for the load, transform, plot and save steps.
+Steps are wrapped in ``stage(name)``, a context manager that also works as a
+decorator. When instrumentation is enabled each stage records its wall time,
+CPU time and the process's peak RSS; nested stages are named by their path
+(``plot_top_countries/savefig``), and chart functions wrapped with ``chart``
+can also dump one cProfile file each. Disabled (the default), a stage only
+checks an environment variable.
+
+Enable with TOURISM_TIMING=1 (plus TOURISM_PROFILE_DIR=<dir> for cProfile
+dumps) or ``render_charts.py --timing [--profile DIR]``; a summary table is
+printed when the run finishes. Settings live in the environment so worker
+processes inherit them.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows; memory is then not reported
+    resource = None
+
+TIMING_ENV = 'TOURISM_TIMING'
+PROFILE_ENV = 'TOURISM_PROFILE_DIR'
+
+# Stage records of this process, and the stack of open stage names per thread
+_records = []
+_local = threading.local()
+if hasattr(os, 'register_at_fork'):
+    # Forked workers report only their own stages
+    os.register_at_fork(after_in_child=_records.clear)
+
+def enabled():
+    """True when stages should be recorded in this process."""
+    return os.environ.get(TIMING_ENV, '') not in ('', '0') or bool(os.environ.get(PROFILE_ENV))
+
+def enable(profile_dir=None):
+    """Turn on timing (and cProfile dumps to ``profile_dir``) here and in child processes."""
+    os.environ[TIMING_ENV] = '1'
+    if profile_dir:
+        os.environ[PROFILE_ENV] = profile_dir
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unknown)."""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+@contextmanager
+def stage(name):
+    """Record wall time, CPU time and peak RSS of the enclosed step as ``name``."""
+    if not enabled():
+        yield
+        return
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(name)
+    path = '/'.join(stack)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        stack.pop()
+        _records.append({
+            'stage': path,
+            'wall': time.perf_counter() - wall,
+            'cpu': time.process_time() - cpu,
+            'peak_rss_mb': peak_rss_mb(),
+            'pid': os.getpid(),
+        })
+
+def chart(func):
+    """Decorator for chart functions: a stage named after the chart and, when a
+    profile directory is set, a cProfile dump ``<dir>/<chart>.prof``."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not enabled():
+            return func(*args, **kwargs)
+        with stage(func.__name__):
+            directory = os.environ.get(PROFILE_ENV)
+            if not directory:
+                return func(*args, **kwargs)
+            import cProfile
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(func, *args, **kwargs)
+            finally:
+                os.makedirs(directory, exist_ok=True)
+                profiler.dump_stats(os.path.join(directory, f'{func.__name__}.prof'))
+    return wrapper
+
+def drain():
+    """Return and forget this process's records (e.g. to send them to a parent process)."""
+    records = list(_records)
+    _records.clear()
+    return records
+
+def add_records(records):
+    """Merge records collected in another process."""
+    _records.extend(records)
+
+def summarize(records):
+    """Per-stage calls, total wall and CPU seconds and highest peak RSS, slowest first."""
+    totals = {}
+    for record in records:
+        total = totals.setdefault(record['stage'], {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_rss_mb': None})
+        total['calls'] += 1
+        total['wall'] += record['wall']
+        total['cpu'] += record['cpu']
+        if record['peak_rss_mb'] is not None:
+            total['peak_rss_mb'] = max(total['peak_rss_mb'] or 0, record['peak_rss_mb'])
+    return dict(sorted(totals.items(), key=lambda item: -item[1]['wall']))
+
+def summary_table(records):
+    lines = [f"{'stage':<60} {'calls':>5} {'wall s':>9} {'cpu s':>9} {'peak MB':>8}"]
+    for name, total in summarize(records).items():
+        peak = '' if total['peak_rss_mb'] is None else f"{total['peak_rss_mb']:.0f}"
+        lines.append(f"{name:<60} {total['calls']:>5} {total['wall']:>9.3f} {total['cpu']:>9.3f} {peak:>8}")
+    return '\n'.join(lines)
+
+def write_summary(path=None):
+    """Print the summary table of every recorded stage; also save records and totals as JSON to ``path``."""
+    records = drain()
+    if not records:
+        return
+    print(summary_table(records))
+    if path:
+        with open(path, 'w') as f:
+            json.dump({'summary': summarize(records), 'records': records}, f, indent=2)
+
+@atexit.register
+def _report_at_exit():
+    # Anything still recorded (e.g. a chart script run directly) is reported at exit
+    if _records:
+        print('\nTiming summary:')
+        write_summary()
@@ -0,0 +1,99 @@
+"""
+Many line series drawn in one pass.
+A long table (one row per series and x value) is grouped once: rows are
+ordered by series code and x and split at the series boundaries, instead of
+filtering the table once per series. All lines are then one LineCollection
+and all markers one scatter, however many series there are. With ``top`` only
+the N highest-ranked series get their own color and legend entry; the rest
+are drawn in one muted color and summarized as a single legend entry.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Labels and one (n, 2) array of x, y points per series
+SeriesSet = namedtuple('SeriesSet', ['labels', 'segments'])
+OTHER_COLOR = '#bdbdbd'
+
+def series_from_frame(df, by, x, y, sort=False):
+    """Group the long table ``df`` once into one series per ``by`` value, ordered by ``x``.
+
+    Series come in order of first appearance (sorted by label with ``sort``).
+    """
+    codes, labels = pd.factorize(df[by], sort=sort)
+    xs = df[x].to_numpy(dtype=float)
+    ys = df[y].to_numpy(dtype=float, na_value=np.nan)
+    keep = codes >= 0
+    codes, xs, ys = codes[keep], xs[keep], ys[keep]
+    order = np.lexsort((xs, codes))
+    codes = codes[order]
+    points = np.column_stack([xs[order], ys[order]])
+    bounds = np.searchsorted(codes, np.arange(1, len(labels)))
+    return SeriesSet(list(labels), np.split(points, bounds))
+
+def series_from_pivot(pivot):
+    """One series per column of a wide table (x in the index); NaN cells leave gaps."""
+    xs = pivot.index.to_numpy(dtype=float)
+    values = pivot.to_numpy(dtype=float, na_value=np.nan)
+    return SeriesSet(list(pivot.columns), [np.column_stack([xs, values[:, i]]) for i in range(values.shape[1])])
+
+def draw_series(ax, series, top=None, rank=None, colors=None, other_color=OTHER_COLOR, other_label='{n} others',
+                linewidth=None, marker='o', markersize=None, legend=True, **legend_kwargs):
+    """Draw every series of ``series`` (a SeriesSet) on ``ax`` as one LineCollection.
+
+    ``top`` keeps colors and legend entries for the N series with the highest
+    ``rank`` (one score per series; default: each series' last value) and
+    draws the others thinner in ``other_color`` behind them, with one legend
+    entry ``other_label``. ``colors``, ``linewidth`` and ``markersize``
+    default to the rcParams used by ``plt.plot``.
+    Returns (LineCollection, scatter of the markers or None, legend or None).
+    """
+    import matplotlib
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+
+    n = len(series.labels)
+    if colors is None:
+        colors = matplotlib.rcParams['axes.prop_cycle'].by_key()['color']
+    linewidth = linewidth or matplotlib.rcParams['lines.linewidth']
+    markersize = markersize or matplotlib.rcParams['lines.markersize']
+    if top is None or top >= n:
+        highlighted = np.arange(n)
+    else:
+        if rank is None:
+            rank = [_last_value(points) for points in series.segments]
+        rank = np.nan_to_num(np.asarray(rank, dtype=float), nan=-np.inf)
+        highlighted = np.sort(np.argsort(-rank, kind='stable')[:top])
+    series_colors = np.full(n, other_color, dtype=object)
+    series_colors[highlighted] = [colors[i % len(colors)] for i in range(len(highlighted))]
+    widths = np.full(n, linewidth / 2)
+    widths[highlighted] = linewidth
+    # Muted series first so the highlighted ones are drawn on top
+    z = np.isin(np.arange(n), highlighted).argsort(kind='stable')
+
+    segments = [series.segments[i] for i in z]
+    lines = LineCollection(segments, colors=list(series_colors[z]), linewidths=widths[z])
+    ax.add_collection(lines)
+    markers = None
+    if marker:
+        points = np.concatenate(segments) if segments else np.empty((0, 2))
+        point_colors = np.repeat(series_colors[z], [len(s) for s in segments])
+        sizes = np.repeat(np.where(np.isin(z, highlighted), markersize, markersize / 2) ** 2, [len(s) for s in segments])
+        markers = ax.scatter(points[:, 0], points[:, 1], c=list(point_colors), s=sizes, marker=marker, zorder=lines.get_zorder())
+    ax.autoscale_view()
+
+    handles = None
+    if legend:
+        handles = [Line2D([], [], color=series_colors[i], linewidth=linewidth, marker=marker or None, markersize=markersize,
+                          label=str(series.labels[i])) for i in highlighted]
+        if len(highlighted) < n:
+            handles.append(Line2D([], [], color=other_color, linewidth=linewidth / 2,
+                                  label=other_label.format(n=n - len(highlighted))))
+        handles = ax.legend(handles=handles, **legend_kwargs)
+    return lines, markers, handles
+
+def _last_value(points):
+    values = points[~np.isnan(points[:, 1]), 1]
+    return values[-1] if len(values) else np.nan
@@ -0,0 +1,168 @@
+"""
+Municipal Visit Rate Visualization
+Creates a choropleth of visit metrics over Japan's ~1,800 municipalities
+(GADM level 2), optionally dissolved up to prefectures.
+
+Metrics are attached by an index lookup on the GADM key rather than a name
+merge; geocoded visit records are assigned to municipalities through an
+STRtree spatial index. Prefecture totals are computed from municipal codes and
+drawn on the level-1 polygons, so no polygons are unioned at render time.
+
+Usage:
+    python municipal_visit_rate.py --metrics municipal_visits.csv --column visits
+    python municipal_visit_rate.py --records visit_points.csv --dissolve
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely import STRtree
+
+from plot_config import STANDARD_TITLE_CONFIG, pyplot, save_figure, write_figure
+from instrumentation import chart
+from geometry_cache import load_geometry, map_tolerance
+from label_layout import draw_callouts, layout_callouts, text_extent
+
+OUTPUT_FILE = 'municipal_visit_rate.png'
+
+def join_metrics(gdf, metrics, column, key='GID_2'):
+    """Values of ``metrics[column]`` aligned to the rows of ``gdf`` by ``key`` (NaN if absent)."""
+    lookup = metrics.set_index(key)[column]
+    if not lookup.index.is_unique:
+        raise ValueError(f'Duplicate {key} values in the metrics table')
+    positions = lookup.index.get_indexer(gdf[key])
+    values = lookup.to_numpy(dtype=float)
+    return np.where(positions >= 0, values[positions], np.nan)
+
+def assign_points(gdf, x, y, max_distance=None):
+    """Row position in ``gdf`` of the polygon holding each point (-1 if none).
+
+    Points in the slivers left between simplified neighbours go to the nearest
+    polygon within ``max_distance`` (default: twice the cache's simplification
+    tolerance).
+    """
+    tree = STRtree(np.asarray(gdf.geometry.values))
+    points = shapely.points(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    owner = np.full(len(points), -1)
+    point_idx, poly_idx = tree.query(points, predicate='intersects')
+    owner[point_idx] = poly_idx
+
+    unmatched = np.flatnonzero(owner < 0)
+    if len(unmatched):
+        if max_distance is None:
+            max_distance = 2 * map_tolerance(gdf.total_bounds)
+        point_idx, poly_idx = tree.query_nearest(points[unmatched], max_distance=max_distance)
+        # Keep one polygon per point when several are equally near
+        point_idx, first = np.unique(point_idx, return_index=True)
+        owner[unmatched[point_idx]] = poly_idx[first]
+    return owner
+
+def point_totals(gdf, x, y, weights=None):
+    """Sum of ``weights`` (or a count) of the points falling in each polygon of ``gdf``."""
+    owner = assign_points(gdf, x, y)
+    inside = owner >= 0
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[inside]
+    return np.bincount(owner[inside], weights=weights, minlength=len(gdf)).astype(float)
+
+def dissolve_to_prefectures(municipalities, values, prefectures, aggfunc='sum'):
+    """Roll municipal ``values`` up to the rows of ``prefectures`` via their GID_1 codes."""
+    codes = pd.Index(prefectures['GID_1']).get_indexer(municipalities['GID_1'])
+    valid = (codes >= 0) & ~np.isnan(values)
+    totals = np.bincount(codes[valid], weights=values[valid], minlength=len(prefectures))
+    if aggfunc == 'sum':
+        return totals
+    if aggfunc == 'mean':
+        counts = np.bincount(codes[valid], minlength=len(prefectures))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return totals / counts
+    raise ValueError(f'Unsupported aggfunc: {aggfunc}')
+
+def _read_table(table):
+    return pd.read_csv(table) if isinstance(table, str) else table
+
+@chart
+def create_municipal_choropleth(metrics=None, records=None, column='visits', key='GID_2',
+                                dissolve=False, top_n=0, output_path=None):
+    """Creates a choropleth of municipal visit metrics, or of their prefecture totals.
+
+    Pass either ``metrics`` (a table keyed by ``key`` with a ``column`` of values)
+    or ``records`` (geocoded points with ``longitude``/``latitude`` and an optional
+    ``column`` of weights), as DataFrames or CSV paths. The ``top_n`` highest
+    areas are numbered with callouts. Saved to ``output_path`` if given, else
+    to municipal_visit_rate.png in the output directory.
+    """
+    if (metrics is None) == (records is None):
+        raise ValueError('Pass exactly one of metrics or records')
+    plt = pyplot()
+
+    municipalities = load_geometry(2)
+    if metrics is not None:
+        values = join_metrics(municipalities, _read_table(metrics), column, key)
+    else:
+        records = _read_table(records)
+        weights = records[column] if column in records else None
+        values = point_totals(municipalities, records['longitude'], records['latitude'], weights)
+
+    prefectures = load_geometry(1)
+    if dissolve:
+        gdf = prefectures.assign(value=dissolve_to_prefectures(municipalities, values, prefectures))
+        level_name = 'Prefecture'
+    else:
+        gdf = municipalities.assign(value=values)
+        level_name = 'Municipal'
+
+    # Create map
+    fig, ax = plt.subplots(1, 1, figsize=(12, 12))
+    gdf.plot(column='value', ax=ax, cmap='Reds', legend=False,
+             missing_kwds={'color': 'lightgrey'}, edgecolor='black', linewidth=0.5 if dissolve else 0.1)
+    if not dissolve:
+        # Prefecture outlines for orientation
+        prefectures.boundary.plot(ax=ax, color='black', linewidth=0.5)
+
+    if top_n:
+        # Number the top areas at their label anchors, largest first
+        order = np.argsort(-np.nan_to_num(gdf['value'].to_numpy(dtype=float), nan=-np.inf), kind='stable')[:top_n]
+        anchor_x = gdf['anchor_x'].to_numpy()[order]
+        anchor_y = gdf['anchor_y'].to_numpy()[order]
+        labels = np.arange(1, len(order) + 1)
+        width, height = text_extent(ax, 6, [len(str(label)) for label in labels])
+        xmin, ymin, xmax, ymax = gdf.total_bounds
+        label_x, label_y = layout_callouts(anchor_x, anchor_y, width, height,
+                                           distance=0.02 * max(xmax - xmin, ymax - ymin),
+                                           center=((xmin + xmax) / 2, (ymin + ymax) / 2))
+        draw_callouts(ax, anchor_x, anchor_y, label_x, label_y, labels, width, height,
+                      line_kwargs={'linewidth': 0.4}, fontsize=6, fontweight='bold', color='black')
+
+    ax.set_title(f'{level_name} Visits in Japan', **STANDARD_TITLE_CONFIG)
+    ax.axis('off')
+
+    # Add color bar
+    sm = plt.cm.ScalarMappable(cmap='Reds', norm=plt.Normalize(vmin=np.nanmin(gdf['value']), vmax=np.nanmax(gdf['value'])))
+    cbar = plt.colorbar(sm, ax=ax, orientation='vertical', shrink=0.8, pad=-0.2)
+    cbar.set_label(column, fontsize=10)
+
+    plt.tight_layout()
+    if output_path is None:
+        output_path = save_figure(OUTPUT_FILE)
+    else:
+        output_path = write_figure(plt.gcf(), output_path)
+    plt.close()
+
+    print(f"{level_name} visit choropleth saved as '{output_path}'")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Municipality-level visit choropleth.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--metrics', help='CSV of metrics keyed by the GADM level-2 id')
+    source.add_argument('--records', help='CSV of geocoded visits with longitude/latitude columns')
+    parser.add_argument('--column', default='visits', help='metric column, or weight column for records')
+    parser.add_argument('--key', default='GID_2', help='key column in the metrics CSV (default: GID_2)')
+    parser.add_argument('--dissolve', action='store_true', help='roll municipalities up to prefectures')
+    parser.add_argument('--top', type=int, default=0, help='number the N highest areas with callouts')
+    parser.add_argument('--output', help=f'output image path (default: visualizations/{OUTPUT_FILE})')
+    args = parser.parse_args()
+
+    create_municipal_choropleth(args.metrics, args.records, args.column, args.key, args.dissolve, args.top, args.output)
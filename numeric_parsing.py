@@ -0,0 +1,26 @@
+"""
+Numeric ingestion helpers shared by the Japan Tourism data scripts.
+Comma-grouped figures are parsed by the CSV reader itself (``thousands=','``),
+so counts arrive as numbers instead of going through a string round-trip.
+"""
+
+import numpy as np
+import pandas as pd
+
+def read_grouped_csv(path, **kwargs):
+    """Read a CSV whose figures use ',' as thousands separator straight into numbers."""
+    return pd.read_csv(path, thousands=',', **kwargs)
+
+def to_nullable_int(values):
+    """Round a float array (NaN for missing) into a nullable Int64 array in one pass."""
+    values = np.asarray(values, dtype=float)
+    mask = np.isnan(values)
+    data = np.round(values)
+    data[mask] = 0
+    return pd.arrays.IntegerArray(data.astype(np.int64), mask)
+
+def parse_currency(series):
+    """Convert strings such as '$5,784' or '¥724' to floats."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    return pd.to_numeric(series.str.replace(r'[$¥,"]', '', regex=True), errors='coerce')
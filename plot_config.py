@@ -1,20 +1,45 @@
 """
 Standardized plotting configuration for Japan Tourism visualizations.
 This module provides consistent font, size, and formatting settings across all charts.
+Importing it does not touch matplotlib; call pyplot() or apply_style() to use the style.
 """
 
-import matplotlib.pyplot as plt
+import os
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
 
-# Set up standardized fonts
-plt.rcParams['font.family'] = 'serif'
-plt.rcParams['font.serif'] = ['Times New Roman', 'DejaVu Serif', 'Georgia']
-plt.rcParams['font.size'] = 12
-plt.rcParams['axes.titlesize'] = 18
-plt.rcParams['axes.labelsize'] = 14
-plt.rcParams['xtick.labelsize'] = 12
-plt.rcParams['ytick.labelsize'] = 12
-plt.rcParams['legend.fontsize'] = 12
-plt.rcParams['figure.titlesize'] = 20
+from instrumentation import stage
+
+# Directory the charts write into; the report server points each worker at its own
+OUTPUT_DIR = 'visualizations'
+
+# Standard rcParams (fonts and sizes), applied by apply_style()
+STANDARD_RC_PARAMS = {
+    'font.family': 'serif',
+    'font.serif': ['Times New Roman', 'DejaVu Serif', 'Georgia'],
+    'font.size': 12,
+    'axes.titlesize': 18,
+    'axes.labelsize': 14,
+    'xtick.labelsize': 12,
+    'ytick.labelsize': 12,
+    'legend.fontsize': 12,
+    'figure.titlesize': 20,
+}
+
+def apply_style():
+    """Apply the standardized fonts and sizes to matplotlib's rcParams."""
+    import matplotlib
+    matplotlib.rcParams.update(STANDARD_RC_PARAMS)
+
+def pyplot():
+    """Return matplotlib.pyplot with the standard style applied.
+
+    Chart functions call this instead of importing pyplot at module level, so
+    importing them stays cheap and free of global side effects.
+    """
+    import matplotlib.pyplot as plt
+    apply_style()
+    return plt
 
 # Standardized formatting configuration
 STANDARD_FONT_CONFIG = {
@@ -63,4 +88,164 @@ STANDARD_FIGURE_CONFIG = {
 STANDARD_GRID_CONFIG = {
     'alpha': 0.3,
     'linestyle': '--'
-} 
\ No newline at end of file
+}
+
+def style_axes(ax, title=None, xlabel=None, ylabel=None, grid=None):
+    """Apply the standard title, label and grid styling to ``ax``.
+
+    ``grid`` is True for both axes or 'x'/'y' for one; None leaves the grid off.
+    """
+    if title is not None:
+        ax.set_title(title, **STANDARD_TITLE_CONFIG)
+    if xlabel is not None:
+        ax.set_xlabel(xlabel, **STANDARD_LABEL_CONFIG)
+    if ylabel is not None:
+        ax.set_ylabel(ylabel, **STANDARD_LABEL_CONFIG)
+    if grid is not None:
+        ax.grid(True, **({} if grid is True else {'axis': grid}), **STANDARD_GRID_CONFIG)
+    return ax
+
+def styled_figure(figsize, **style):
+    """New pyplot figure and axes styled with style_axes(**style)."""
+    fig, ax = pyplot().subplots(figsize=figsize)
+    return fig, style_axes(ax, **style)
+
+@lru_cache(maxsize=None)
+def resolve_fonts():
+    """Font files for the standard family at normal and bold weight, looked up once per process."""
+    from matplotlib import font_manager
+    apply_style()
+    return {
+        weight: font_manager.findfont(font_manager.FontProperties(family=STANDARD_FONT_CONFIG['fontfamily'], weight=weight))
+        for weight in ('normal', 'bold')
+    }
+
+# Styled figures kept between renders, keyed by chart and layout (see figure_template)
+FigureTemplate = namedtuple('FigureTemplate', ['fig', 'ax', 'artists'])
+TEMPLATE_CACHE_SIZE = 32
+_templates = OrderedDict()
+
+def figure_template(key, build, figsize, **style):
+    """Styled figure for ``key``, built on first use and reused afterwards.
+
+    ``build(ax)`` adds the artists whose data changes between renders and
+    returns them; charts then update those in place (``set_data``,
+    ``set_height``, ``set_text``) for each parameter set instead of building
+    and styling a new figure. Template figures are not registered with pyplot,
+    so they survive ``plt.close()`` and must be passed to save_figure
+    explicitly. Keys should include anything that changes the number of
+    artists (e.g. the number of bars).
+    """
+    template = _templates.get(key)
+    if template is not None:
+        _templates.move_to_end(key)
+        return template
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    resolve_fonts()
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = style_axes(fig.subplots(), **style)
+    template = _templates[key] = FigureTemplate(fig, ax, build(ax))
+    while len(_templates) > TEMPLATE_CACHE_SIZE:
+        _templates.popitem(last=False)
+    return template
+
+def tight_layout(fig, **kwargs):
+    """``fig.tight_layout`` starting from the default subplot parameters.
+
+    Labels sticking out of the axes make tight_layout depend on the previous
+    layout; resetting first gives a reused template the layout of a new figure.
+    """
+    import matplotlib
+    fig.subplots_adjust(**{side: matplotlib.rcParams[f'figure.subplot.{side}'] for side in ('left', 'right', 'bottom', 'top')})
+    fig.tight_layout(**kwargs)
+
+def clear_templates():
+    """Forget every cached figure template."""
+    _templates.clear()
+
+# How saved charts are written: file format, resolution, whether to use the
+# single-draw fast path (raster formats only) and encoder options for Pillow
+OutputProfile = namedtuple('OutputProfile', ['format', 'dpi', 'fast', 'pil_kwargs'])
+
+OUTPUT_PROFILES = {
+    # Publication output, identical to STANDARD_FIGURE_CONFIG
+    'print': OutputProfile('png', STANDARD_FIGURE_CONFIG['dpi'], False, None),
+    # Pages and slides: half the resolution, lossy WebP
+    'web': OutputProfile('webp', 150, False, {'quality': 90}),
+    # Dashboards and quick looks: screen resolution, one draw, light PNG compression
+    'preview': OutputProfile('png', 72, True, {'compress_level': 1}),
+    # Scalable vector output (raster elements such as heatmap cells at 150 dpi)
+    'svg': OutputProfile('svg', 150, False, None),
+}
+# Profile used by save_figure; set per run (render_charts.py --output-profile, or
+# the TOURISM_OUTPUT_PROFILE environment variable)
+OUTPUT_PROFILE = os.environ.get('TOURISM_OUTPUT_PROFILE', 'print')
+
+def get_profile(profile=None):
+    """The OutputProfile called ``profile`` (default: OUTPUT_PROFILE); profiles pass through."""
+    if isinstance(profile, OutputProfile):
+        return profile
+    name = profile or OUTPUT_PROFILE
+    if name not in OUTPUT_PROFILES:
+        raise ValueError(f'Unknown output profile: {name!r} (expected one of {sorted(OUTPUT_PROFILES)})')
+    return OUTPUT_PROFILES[name]
+
+def profile_path(path, profile=None):
+    """``path`` with its extension replaced by the profile's format."""
+    return os.path.splitext(path)[0] + '.' + get_profile(profile).format
+
+def output_file(filename):
+    """Path of a chart output inside OUTPUT_DIR."""
+    return os.path.join(OUTPUT_DIR, filename)
+
+def _save_single_draw(fig, path, profile):
+    """Draw once, crop to the tight bounding box and encode with Pillow.
+
+    ``savefig(bbox_inches='tight')`` draws the figure to measure it and then
+    again to save it; here the measured frame is cropped instead. Artists
+    reaching past the figure edge are clipped rather than expanding the canvas.
+    """
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from PIL import Image
+
+    pad = pyplot().rcParams['savefig.pad_inches']
+    original_dpi = fig.dpi
+    canvas = fig.canvas if isinstance(fig.canvas, FigureCanvasAgg) else FigureCanvasAgg(fig)
+    try:
+        fig.dpi = profile.dpi
+        canvas.draw()
+        bbox = fig.get_tightbbox(canvas.get_renderer()).padded(pad)
+        height = canvas.get_width_height()[1]
+        pixels = np.asarray(canvas.buffer_rgba())
+    finally:
+        fig.dpi = original_dpi
+    x0, x1 = (np.clip([bbox.x0, bbox.x1], 0, fig.get_figwidth()) * profile.dpi).round().astype(int)
+    y0, y1 = (np.clip([bbox.y0, bbox.y1], 0, fig.get_figheight()) * profile.dpi).round().astype(int)
+    image = Image.fromarray(pixels[height - y1:height - y0, x0:x1])
+    if profile.format in ('jpeg', 'jpg'):
+        image = image.convert('RGB')
+    image.save(path, format=profile.format, dpi=(profile.dpi, profile.dpi), **(profile.pil_kwargs or {}))
+
+def write_figure(fig, path, profile=None):
+    """Write ``fig`` to ``path`` (extension set by the profile) and return the path written."""
+    profile = get_profile(profile)
+    path = os.path.splitext(path)[0] + '.' + profile.format
+    with stage('savefig'):
+        if profile.fast and profile.format != 'svg':
+            _save_single_draw(fig, path, profile)
+        else:
+            options = {'pil_kwargs': profile.pil_kwargs} if profile.pil_kwargs else {}
+            fig.savefig(path, format=profile.format, dpi=profile.dpi, bbox_inches='tight', **options)
+    return path
+
+def save_figure(filename, fig=None, profile=None):
+    """Save ``fig`` (default: the current figure) into OUTPUT_DIR with the output profile's settings.
+
+    The print profile writes exactly what ``savefig(**STANDARD_FIGURE_CONFIG)`` does.
+    """
+    if fig is None:
+        fig = pyplot().gcf()
+    return write_figure(fig, output_file(filename), profile)
@@ -3,18 +3,23 @@ Prefecture Visit Rate Visualization
 Creates a choropleth map showing visit rates to different prefectures in Japan.
 """
 
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import geopandas as gpd
-from plot_config import STANDARD_FIGURE_CONFIG, STANDARD_TITLE_CONFIG
+from plot_config import STANDARD_TITLE_CONFIG, pyplot, save_figure
+from instrumentation import chart
+from geometry_cache import load_geometry
+from label_layout import draw_callouts, layout_callouts, text_extent
 
-def create_prefecture_choropleth():
-    """Creates a choropleth map of prefecture visit rates in Japan."""
+@chart
+def create_prefecture_choropleth(top_n=10):
+    """Creates a choropleth map of prefecture visit rates in Japan, numbering the top ``top_n``."""
+    plt = pyplot()
     
     # Load data
     df = pd.read_csv('raw_data/prefecture_visit_rate_2024.csv')
-    top_10 = df.nlargest(10, 'Visit Rate(%)')
-    gdf = gpd.read_file('shapefiles/gadm41_JPN_1.shp')
+    top_n_df = df.nlargest(top_n, 'Visit Rate(%)')
+    # Simplified prefecture polygons with precomputed centroids
+    gdf = load_geometry(1)
     
     # Map prefecture names to shapefile names
     name_mapping = {
@@ -45,37 +50,22 @@ def create_prefecture_choropleth():
     gdf.plot(column='Visit Rate(%)', ax=ax, cmap='Reds', legend=False, 
              missing_kwds={'color': 'lightgrey'}, edgecolor='black', linewidth=0.5)
     
-    # Number positioning directions
-    directions = [
-        (1.2, -1.5), (1.5, -1.2), (1.5, -0.8), (-1.2, 1.5), (-1.8, 0.6),
-        (-0.9, -1.2), (0.8, -1.8), (1.8, -0.9), (0, 0), (0.8, -1.8)
-    ]
-    
-    # Add numbers and lines
-    for i, (idx, row) in enumerate(top_10.iterrows(), 1):
-        prefecture_geom = gdf[gdf['Prefecture'] == row['Prefecture']]
-        if not prefecture_geom.empty:
-            centroid = prefecture_geom.geometry.iloc[0].centroid
-            direction = directions[i-1]
-            
-            if i == 9:
-                # Number 9 inside prefecture
-                ax.annotate(str(i), xy=(centroid.x, centroid.y), xytext=(0, 0), 
-                           textcoords='offset points', fontsize=10, fontweight='bold', 
-                           color='black', ha='center', va='center')
-            else:
-                # Numbers outside with connecting lines
-                number_x = centroid.x + direction[0]
-                number_y = centroid.y + direction[1]
-                ax.plot([centroid.x, number_x], [centroid.y, number_y], 
-                       color='black', linewidth=0.8, alpha=0.7)
-                
-                # Offset number position
-                number_offset_x = number_x + (direction[0] * 0.15)
-                number_offset_y = number_y + (direction[1] * 0.15)
-                ax.annotate(str(i), xy=(number_offset_x, number_offset_y), xytext=(0, 0), 
-                           textcoords='offset points', fontsize=10, fontweight='bold', 
-                           color='black', ha='center', va='center')
+    # Centroids of the top prefectures in one lookup (unmatched names are skipped)
+    ranks = np.arange(1, len(top_n_df) + 1)
+    centroids = gdf.dropna(subset=['Prefecture']).set_index('Prefecture')[['centroid_x', 'centroid_y']]
+    centroids = centroids.reindex(top_n_df['Prefecture']).to_numpy()
+    found = ~np.isnan(centroids[:, 0])
+    anchor_x, anchor_y = centroids[found, 0], centroids[found, 1]
+
+    # Numbers outside the map with connecting lines, placed without overlaps
+    labels = ranks[found]
+    width, height = text_extent(ax, 10, [len(str(label)) for label in labels])
+    xmin, ymin, xmax, ymax = gdf.total_bounds
+    label_x, label_y = layout_callouts(anchor_x, anchor_y, width, height,
+                                       distance=0.06 * max(xmax - xmin, ymax - ymin),
+                                       center=((xmin + xmax) / 2, (ymin + ymax) / 2))
+    draw_callouts(ax, anchor_x, anchor_y, label_x, label_y, labels, width, height,
+                  fontsize=10, fontweight='bold', color='black')
     
     # Customize plot
     ax.set_title('Prefecture Visit Rates in Japan (2024)', **STANDARD_TITLE_CONFIG)
@@ -87,25 +77,25 @@ def create_prefecture_choropleth():
     cbar.set_label('Visit Rate (%)', fontsize=10)
     
     # Add legend
-    ax.text(0.1, 0.98, "Top 10 Prefectures:", transform=ax.transAxes, 
+    ax.text(0.1, 0.98, f"Top {top_n} Prefectures:", transform=ax.transAxes, 
             fontsize=16, verticalalignment='top', fontweight='bold',
             bbox=dict(boxstyle="round,pad=0.5", facecolor='white', alpha=0.9))
     
-    legend_list = ""
-    for i, (idx, row) in enumerate(top_10.iterrows(), 1):
-        visit_rate = float(row['Visit Rate(%)'])
-        rounded_rate = round(visit_rate, 1)
-        legend_list += f"{i}. {row['Prefecture']}: {rounded_rate}%\n"
+    legend_list = "".join(
+        f"{i}. {prefecture}: {round(float(rate), 1)}%\n"
+        for i, prefecture, rate in zip(ranks, top_n_df['Prefecture'], top_n_df['Visit Rate(%)'])
+    )
     
     ax.text(0.1, 0.92, legend_list, transform=ax.transAxes, 
             fontsize=16, verticalalignment='top', fontweight='normal',
             bbox=dict(boxstyle="round,pad=0.5", facecolor='white', alpha=0.9))
     
     plt.tight_layout()
-    plt.savefig('visualizations/prefecture_visit_rate.png', **STANDARD_FIGURE_CONFIG)
+    path = save_figure('prefecture_visit_rate.png')
     plt.show()
+    plt.close()
     
-    print("Prefecture visit rate choropleth saved as 'visualizations/prefecture_visit_rate.png'")
+    print(f"Prefecture visit rate choropleth saved as '{path}'")
 
 if __name__ == "__main__":
     create_prefecture_choropleth() 
\ No newline at end of file
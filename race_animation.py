@@ -0,0 +1,195 @@
+"""
+Bar chart race renderer for the Japan Tourism animations.
+Values and ranks are interpolated once as NumPy arrays on a timeline fine enough
+for every output; each output keeps one figure whose bar artists are updated in
+place. Frame ranges are drawn in worker processes and streamed, in order, into
+one ffmpeg pipe per output, so the MP4 and the GIF come from a single frame pass.
+"""
+
+import math
+import os
+import shutil
+import subprocess
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib import ticker
+
+from instrumentation import stage
+from plot_config import COLOR_PALETTE, apply_style
+
+# One encoded file: where it goes, its figure size/dpi, title and tick label
+# sizes, and how many frames each period is interpolated into
+RaceOutput = namedtuple('RaceOutput', ['filename', 'figsize', 'dpi', 'title_size', 'tick_label_size', 'steps_per_period'])
+
+# ffmpeg arguments after the raw-frame input, by file extension
+ENCODER_ARGS = {
+    'mp4': ['-c:v', 'libx264', '-pix_fmt', 'yuv420p'],
+    'gif': ['-filter_complex', '[0:v]split[a][b];[a]palettegen[p];[b][p]paletteuse'],
+}
+
+def interpolate_race(pivot, steps_per_period, n_bars):
+    """Interpolate a period x column pivot into per-frame values and bar positions.
+
+    Returns ``(periods, values, ranks)`` with one row per frame. Ranks are taken
+    at each period (ties broken by column order), clipped to ``n_bars + 1``,
+    flipped so the largest bar sits at the top, and interpolated linearly like
+    the values.
+    """
+    index = pivot.index.to_numpy(dtype=float)
+    values = pivot.to_numpy(dtype=float)
+    order = np.argsort(-values, axis=1, kind='stable')
+    ranks = np.empty_like(values)
+    np.put_along_axis(ranks, order, np.arange(1, values.shape[1] + 1, dtype=float)[None, :], axis=1)
+    ranks = n_bars + 1 - np.minimum(ranks, n_bars + 1)
+
+    n_frames = (len(index) - 1) * steps_per_period + 1
+    position = np.arange(n_frames) / steps_per_period
+    left = np.minimum(position.astype(int), len(index) - 2)
+    frac = (position - left)[:, None]
+
+    def lerp(a):
+        return a[left] * (1 - frac) + a[left + 1] * frac
+
+    return lerp(index[:, None])[:, 0], lerp(values), lerp(ranks)
+
+class _RaceFigure:
+    """One output's figure; bars, ticks and labels are updated in place per frame."""
+
+    def __init__(self, output, columns, n_bars, title, color, bar_size, period_fmt):
+        self.output = output
+        self.columns = np.asarray(columns, dtype=object)
+        self.n_bars = n_bars
+        self.bar_size = bar_size
+        self.period_fmt = period_fmt
+
+        self.fig = Figure(figsize=output.figsize, dpi=output.dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        ax = self.ax = self.fig.add_subplot()
+        ax.set_ylim(.2, n_bars + .8)
+        ax.grid(True, axis='x', color='white')
+        ax.xaxis.set_major_formatter(ticker.StrMethodFormatter('{x:,.0f}'))
+        ax.minorticks_off()
+        ax.set_axisbelow(True)
+        ax.tick_params(length=0, labelsize=output.tick_label_size, pad=2)
+        ax.set_facecolor('.9')
+        ax.set_title(title, size=output.title_size)
+        for spine in ax.spines.values():
+            spine.set_visible(False)
+
+        n = len(self.columns)
+        self.bars = ax.barh(np.zeros(n), np.zeros(n), height=bar_size, color=color, alpha=.8, ec='white')
+        self.labels = [ax.text(0, 0, '', ha='left', va='center', fontsize=7, visible=False) for _ in range(n)]
+        self.period_label = ax.text(.95, .15, '', transform=ax.transAxes, size=12, ha='right', va='center')
+
+        # Reserve room for the longest names once so the layout stays fixed
+        longest = sorted(self.columns, key=len)[-n_bars:]
+        ax.set_yticks(np.arange(1, len(longest) + 1), labels=longest)
+        self.fig.tight_layout()
+        self.size = self.canvas.get_width_height()
+
+    def draw(self, period, values, ranks):
+        """Render one frame and return it as packed RGB bytes."""
+        shown = (ranks > 0) & (ranks < self.n_bars + 1)
+        xmax = values[shown].max() * 1.1 if shown.any() else 1
+        for bar, label, value, rank, visible in zip(self.bars, self.labels, values, ranks, shown):
+            bar.set_visible(visible)
+            label.set_visible(visible)
+            if visible:
+                bar.set_y(rank - self.bar_size / 2)
+                bar.set_width(value)
+                label.set_position((value + .01 * xmax, rank))
+                label.set_text(f'{value:,.0f}')
+        self.ax.set_xlim(0, xmax)
+        self.ax.set_yticks(ranks[shown], labels=self.columns[shown])
+        self.period_label.set_text(self.period_fmt.format(x=period))
+        self.canvas.draw()
+        return np.asarray(self.canvas.buffer_rgba())[:, :, :3].tobytes()
+
+# Per-process render state, set by _init_renderer
+_state = {}
+
+def _init_renderer(race, outputs, strides, columns, options):
+    matplotlib.use('Agg')
+    apply_style()
+    with matplotlib.rc_context({'font.weight': 'bold'}):
+        figures = [_RaceFigure(output, columns, **options) for output in outputs]
+    _state.update(race=race, figures=figures, strides=strides)
+
+def _render_chunk(start, stop):
+    """Draw the frames of every output that fall in fine-timeline steps [start, stop)."""
+    periods, values, ranks = _state['race']
+    chunks = []
+    with matplotlib.rc_context({'font.weight': 'bold'}):
+        for figure, stride in zip(_state['figures'], _state['strides']):
+            steps = range(-(-start // stride) * stride, stop, stride)
+            chunks.append(b''.join(figure.draw(periods[i], values[i], ranks[i]) for i in steps))
+    return chunks
+
+def _open_encoder(output, size, fps):
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError('ffmpeg is required to write bar chart race animations; see https://www.ffmpeg.org/download.html')
+    extension = output.filename.rsplit('.', 1)[-1].lower()
+    if extension not in ENCODER_ARGS:
+        raise ValueError(f'Unsupported animation format: {extension}')
+    command = [
+        ffmpeg, '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{size[0]}x{size[1]}', '-r', f'{fps:g}', '-i', '-',
+        *ENCODER_ARGS[extension], output.filename,
+    ]
+    return subprocess.Popen(command, stdin=subprocess.PIPE)
+
+def render_race(pivot, outputs, title, n_bars=15, period_length=2500, color=COLOR_PALETTE[0],
+                bar_size=.95, period_fmt='{x:.0f}', workers=None, chunksize=12):
+    """Render a bar chart race of ``pivot`` (periods x columns) to every output.
+
+    Frames are drawn ``chunksize`` fine-timeline steps at a time across
+    ``workers`` processes (``1`` draws in-process) and piped to ffmpeg in order;
+    only a few chunks are in flight at once, so memory does not grow with length.
+    """
+    outputs = list(outputs)
+    fine_steps = math.lcm(*(output.steps_per_period for output in outputs))
+    strides = [fine_steps // output.steps_per_period for output in outputs]
+    with stage('interpolate_race'):
+        race = interpolate_race(pivot, fine_steps, n_bars)
+    n_steps = len(race[0])
+    options = dict(n_bars=n_bars, title=title, color=color, bar_size=bar_size, period_fmt=period_fmt)
+    init_args = (race, outputs, strides, list(pivot.columns), options)
+    workers = workers or os.cpu_count()
+
+    # Frame sizes come from the same layout the workers will use
+    _init_renderer(*init_args)
+    encoders = [
+        _open_encoder(output, figure.size, 1000 / period_length * output.steps_per_period)
+        for output, figure in zip(outputs, _state['figures'])
+    ]
+    bounds = [(start, min(start + chunksize, n_steps)) for start in range(0, n_steps, chunksize)]
+    try:
+        # Frames are drawn and piped to ffmpeg together
+        with stage('race_frames'):
+            if workers == 1:
+                for start, stop in bounds:
+                    for encoder, frames in zip(encoders, _render_chunk(start, stop)):
+                        encoder.stdin.write(frames)
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_renderer, initargs=init_args) as pool:
+                    pending = deque()
+                    for start, stop in bounds:
+                        pending.append(pool.submit(_render_chunk, start, stop))
+                        # Keep a bounded window of chunks in flight and write them in order
+                        while len(pending) > workers + 1 or (pending and stop == n_steps):
+                            for encoder, frames in zip(encoders, pending.popleft().result()):
+                                encoder.stdin.write(frames)
+    finally:
+        with stage('race_encoder_flush'):
+            for encoder in encoders:
+                encoder.stdin.close()
+            failed = [output.filename for output, encoder in zip(outputs, encoders) if encoder.wait() != 0]
+    if failed:
+        raise RuntimeError(f"ffmpeg failed to write {', '.join(failed)}")
+    return [output.filename for output in outputs]
@@ -0,0 +1,130 @@
+"""
+As-of lookups of exchange rates, price indices and other dated rates.
+A rate table (AsOfTable) holds the dates from which each value is valid,
+optionally per key (e.g. per country), as sorted NumPy arrays. Looking up a
+whole series of dates is one ``np.searchsorted`` call, the same match as
+``pd.merge_asof`` (the latest table date on or before each date), so a spend
+series can be converted at its own frequency (yearly, monthly, daily)
+whatever the frequency of the table. Tables are read once per file and
+process (``load_rate_table``).
+
+Dates may be given as datetimes, date strings or plain years (a year stands
+for January 1st of that year).
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import stage
+from numeric_parsing import parse_currency
+
+FX_PATH = os.path.join('raw_data', 'jpy_usd_rates.csv')
+TRAVEL_COSTS_PATH = os.path.join('raw_data', 'travel_costs.csv')
+SPEND_PER_CAPITA_PATH = os.path.join('raw_data', 'spend_per_capita.csv')
+# Validity of the entries of a yearly table (until the same date a year later)
+YEARLY = pd.DateOffset(years=1)
+
+def to_datetime64(values):
+    """``values`` (datetimes, date strings or years) as a datetime64[ns] array."""
+    values = pd.Series(values).reset_index(drop=True)
+    if pd.api.types.is_numeric_dtype(values):
+        values = values.astype(int).astype(str) + '-01-01'
+    elif values.dtype == object:
+        values = values.map(lambda v: f'{v}-01-01' if isinstance(v, (int, np.integer)) else v)
+    return pd.to_datetime(values).to_numpy(dtype='datetime64[ns]')
+
+class AsOfTable:
+    """Values valid from each date on, optionally per key, sorted by (key, date)."""
+
+    def __init__(self, dates, values, keys=None):
+        values = pd.DataFrame(values).reset_index(drop=True)
+        dates = to_datetime64(dates)
+        if keys is None:
+            self.keys = None
+            key_codes = np.zeros(len(dates), dtype=np.int64)
+        else:
+            key_codes, self.keys = pd.factorize(pd.Series(keys).to_numpy(), sort=True)
+        # Every table date is replaced by its rank among the distinct dates, so
+        # (key, date) pairs become one sorted integer array
+        self.dates, date_ranks = np.unique(dates, return_inverse=True)
+        order = np.lexsort((date_ranks, key_codes))
+        self.columns = list(values.columns)
+        self.values = values.to_numpy(dtype=float)[order]
+        self.key_codes = key_codes[order]
+        self.row_dates = dates[order]
+        self._stride = len(self.dates) + 1
+        self._sort_keys = self.key_codes * self._stride + date_ranks[order] + 1
+
+    @classmethod
+    def from_frame(cls, df, date, columns, key=None):
+        """Table of ``columns`` of ``df`` valid from its ``date`` column on, per ``key`` if given."""
+        return cls(df[date], df[list(columns)], None if key is None else df[key])
+
+    def positions(self, dates, keys=None, valid_for=None):
+        """Row of the latest entry on or before each date (for its key), -1 where there is none.
+
+        With ``valid_for`` (a Timedelta or DateOffset) an entry only applies to
+        dates before its own date plus ``valid_for``.
+        """
+        dates = to_datetime64(dates)
+        if self.keys is None:
+            key_codes = np.zeros(len(dates), dtype=np.int64)
+        else:
+            if keys is None:
+                raise ValueError('This rate table is keyed; pass keys with the dates')
+            key_codes = pd.Index(self.keys).get_indexer(pd.Series(keys).to_numpy())
+        date_ranks = np.searchsorted(self.dates, dates, side='right')
+        rows = np.searchsorted(self._sort_keys, key_codes * self._stride + date_ranks, side='right') - 1
+        found = (key_codes >= 0) & (rows >= 0)
+        found[found] &= self.key_codes[rows[found]] == key_codes[found]
+        if valid_for is not None:
+            expiry = (pd.DatetimeIndex(self.row_dates[rows[found]]) + valid_for).to_numpy(dtype='datetime64[ns]')
+            found[found] &= dates[found] < expiry
+        return np.where(found, rows, -1)
+
+    def lookup(self, dates, keys=None, column=None, valid_for=None):
+        """Value of ``column`` (default: the first) as of each date, NaN where there is none."""
+        values = self.values[:, 0 if column is None else self.columns.index(column)]
+        rows = self.positions(dates, keys, valid_for)
+        return np.where(rows >= 0, values[rows], np.nan)
+
+    def convert(self, amounts, dates, keys=None, column=None, valid_for=None):
+        """``amounts`` multiplied by the rate as of each date."""
+        return np.asarray(amounts, dtype=float) * self.lookup(dates, keys, column, valid_for)
+
+    def rebase(self, amounts, dates, base, keys=None, column=None):
+        """``amounts`` at each date's index value restated at the value as of ``base``.
+
+        For a price index this is the inflation adjustment to ``base``'s prices.
+        """
+        at_base = self.lookup(np.repeat(to_datetime64([base]), len(np.atleast_1d(amounts))), keys, column)
+        return np.asarray(amounts, dtype=float) * at_base / self.lookup(dates, keys, column)
+
+@lru_cache(maxsize=None)
+def load_rate_table(path, date, columns, key=None, thousands=None):
+    """AsOfTable of ``columns`` (a tuple) from the CSV at ``path``, read once per process.
+
+    Currency formatting ('$1,234') in the value columns is stripped. Cached,
+    so callers must not modify the result in place.
+    """
+    with stage(f'load_rate_table({os.path.basename(path)})'):
+        df = pd.read_csv(path, thousands=thousands)
+        df.columns = [c.strip() for c in df.columns]
+        for column in columns:
+            df[column] = parse_currency(df[column])
+        return AsOfTable.from_frame(df, date, columns, key)
+
+def fx_rates(path=FX_PATH):
+    """USD per JPY (yearly averages, valid from each January 1st)."""
+    return load_rate_table(path, 'date', ('jpy_usd',))
+
+def cpi_index(path=TRAVEL_COSTS_PATH):
+    """Consumer price index per country (2024 = 100)."""
+    return load_rate_table(path, 'Year', ('CPI_2024_Index',), key='Country')
+
+def spend_per_capita(path=SPEND_PER_CAPITA_PATH):
+    """Consumption per visitor in JPY by year (survey years only)."""
+    return load_rate_table(path, 'Year', ('Consumption Amount',), thousands=',')
@@ -0,0 +1,409 @@
+"""
+Parallel chart rendering for the Japan Tourism visualizations.
+Runs independent chart jobs in a process pool with the Agg backend. Visitor
+charts receive only the roll-up of the visitor cube they read, computed once
+in the parent process.
+
+Each job's inputs are fingerprinted into visualizations/.build_manifest.json:
+the data slice it draws or the raw files it reads, its parameters, the source
+of the chart function and of the module-level helpers it uses, and every
+project module those import (found by parsing the imports, so a chart's
+dependencies need not be listed by hand). Charts whose fingerprint is
+unchanged and whose outputs exist are skipped.
+
+Usage:
+    python render_charts.py                       # every out-of-date chart, one worker per core
+    python render_charts.py --workers 4 top_countries monthly_heatmap
+    python render_charts.py --force               # ignore the manifest
+    python render_charts.py --list
+    python render_charts.py --force --timing --profile profiles/   # per-stage summary + cProfile dumps
+    python render_charts.py --output-profile preview   # 72 dpi single-draw PNGs for dashboards
+"""
+
+import argparse
+import ast
+import hashlib
+import importlib
+import json
+import os
+import time
+from collections import namedtuple
+from contextlib import ExitStack
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import instrumentation
+import plot_config
+
+MANIFEST_PATH = os.path.join('visualizations', '.build_manifest.json')
+STYLE_PATH = 'plot_config.py'
+# Visitor charts only read tourist counts, so other measures do not invalidate them
+CHART_MEASURES = ['tourist']
+
+# module/function to call, files written, roll-up dimensions to pass as ``cube``
+# (None for charts that do not read visitor counts), data files read directly,
+# whether the roll-up excludes "Unclassified" countries, extra keyword arguments,
+# whether the roll-up is cut to the chart's ``years`` minus ``exclude_years``, and
+# whether the chart spreads its own work over ``workers`` processes (see render_charts)
+ChartJob = namedtuple('ChartJob', ['module', 'function', 'outputs', 'dims', 'inputs', 'classified', 'kwargs', 'window',
+                                   'parallel'],
+                      defaults=(None, (), True, {}, False, False))
+# Share of the workers left to the chart pool while a parallel job runs; the
+# other charts together take a small fraction of the bar chart race's CPU time
+CHART_POOL_SHARE = 0.25
+
+def _output(name):
+    return (os.path.join('visualizations', name),)
+
+def _raw(*names):
+    return tuple(os.path.join('raw_data', name) for name in names)
+
+PREFECTURE_SHAPEFILE = tuple(os.path.join('shapefiles', f'gadm41_JPN_1.{ext}') for ext in ('shp', 'shx', 'dbf', 'prj', 'cpg'))
+
+# Ordered slowest first so the long animations start before the quick charts
+JOBS = {
+    'barchart_race': ChartJob('visualize_tourism_growth', 'animate_top_15_countries', _output('top_15_countries_barchart_race.mp4') + _output('top_15_countries_barchart_race.gif'), ('year', 'country'), window=True, parallel=True),
+    'prefecture_visit_rate': ChartJob('prefecture_visit_rate', 'create_prefecture_choropleth', _output('prefecture_visit_rate.png'), inputs=_raw('prefecture_visit_rate_2024.csv') + PREFECTURE_SHAPEFILE),
+    'monthly_heatmap': ChartJob('visualize_tourism_growth', 'plot_monthly_distribution_heatmap', _output('monthly_distribution_heatmap.png'), ('year', 'month')),
+    'total_visitors_growth': ChartJob('visualize_tourism_growth', 'plot_total_visitors_growth', _output('total_visitors_growth.png'), ('year',)),
+    'top_countries': ChartJob('visualize_tourism_growth', 'plot_top_countries', _output('top_10_countries.png'), ('year', 'country')),
+    'post_covid_growth': ChartJob('visualize_tourism_growth', 'plot_post_covid_growth', _output('top_10_highest_growth.png'), ('year', 'country')),
+    'two_period_growth': ChartJob('visualize_tourism_growth', 'plot_two_period_growth_comparison', _output('two_period_growth_comparison.png'), ('year',), _raw('tourism_top_10_countries.csv')),
+    'region_distribution': ChartJob('visualize_tourism_growth', 'plot_stacked_region_distribution', _output('stacked_region_distribution.png'), ('year', 'region')),
+    'country_trends': ChartJob('visualize_tourism_growth', 'plot_country_trends', _output('country_tourist_trends.png'), ('year', 'country')),
+    'travel_costs': ChartJob('travel_costs', 'plot_travel_costs', _output('travel_costs_cpi_adjusted.png'), inputs=_raw('travel_costs.csv')),
+    'total_yearly_spend': ChartJob('travel_costs', 'plot_total_yearly_spend', _output('total_yearly_spend_usd.png'), ('year',), _raw('spend_per_capita.csv', 'jpy_usd_rates.csv'), classified=False),
+    'anime_market': ChartJob('cultural_exports', 'plot_anime_market', _output('anime_market_growth.png'), inputs=_raw('Anime_market_stats.csv')),
+    'manga_market': ChartJob('cultural_exports', 'plot_manga_market', _output('manga_market_growth.png'), inputs=_raw('Manga_market_stats.csv')),
+    'sushi_restaurants': ChartJob('cultural_exports', 'plot_sushi_restaurants', _output('sushi_restaurants_growth.png'), inputs=_raw('sushi_restaurants_in_USA.csv')),
+    'visit_motivation': ChartJob('visit_motivation', 'plot_visit_motivation', _output('visit_motivation.png'), inputs=_raw('purpose_of_visit_2024.csv')),
+}
+
+def _init_worker():
+    # Headless rendering; must happen before any chart module imports pyplot
+    os.environ['MPLBACKEND'] = 'Agg'
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _run_job(name, job, cube, output_profile=None, workers=None):
+    start = time.perf_counter()
+    if output_profile:
+        plot_config.OUTPUT_PROFILE = output_profile
+        plot_config.OUTPUT_DIR = output_dir(output_profile)
+        os.makedirs(plot_config.OUTPUT_DIR, exist_ok=True)
+    module = importlib.import_module(job.module)
+    func = getattr(module, job.function)
+    kwargs = dict(job.kwargs) if workers is None else dict(job.kwargs, workers=workers)
+    if cube is not None:
+        func(cube=cube, **kwargs)
+    else:
+        func(**kwargs)
+    # Stage timings go back to the parent, which prints the summary
+    return name, time.perf_counter() - start, instrumentation.drain()
+
+def chart_window(job):
+    """(years, exclude_years) the chart draws: its keyword arguments, else its signature defaults."""
+    import inspect
+
+    from visitor_queries import normalize_years
+
+    parameters = inspect.signature(getattr(importlib.import_module(job.module), job.function)).parameters
+    def argument(name):
+        if name in job.kwargs:
+            return job.kwargs[name]
+        return parameters[name].default if name in parameters else None
+    return normalize_years(argument('years')), normalize_years(argument('exclude_years')) or ()
+
+def _job_slices(names):
+    """Pre-aggregate each visitor roll-up once and share it between jobs.
+
+    Jobs with ``window`` get the roll-up cut to the years they draw, so data
+    outside those years neither reaches nor invalidates them.
+    """
+    from visitor_cube import load_classified_cube, load_cube
+
+    rollups = {}
+    slices = {}
+    for name in names:
+        job = JOBS[name]
+        if job.dims is None:
+            slices[name] = None
+            continue
+        key = (job.dims, job.classified)
+        if key not in rollups:
+            cube = load_classified_cube() if job.classified else load_cube()
+            rollups[key] = cube.project(*job.dims, measures=CHART_MEASURES)
+        slices[name] = rollups[key]
+        if job.window:
+            years, exclude = chart_window(job)
+            data = slices[name].data
+            keep = ~data['year'].isin(exclude)
+            if years is not None:
+                keep &= data['year'].isin(years)
+            slices[name] = slices[name].where(keep)
+    return slices
+
+def _hash_file(digest, path):
+    digest.update(path.encode())
+    if not os.path.exists(path):
+        digest.update(b'<missing>')
+        return
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+
+def output_dir(output_profile=None):
+    """visualizations/ for print output, visualizations/<profile>/ for the other profiles."""
+    if output_profile in (None, 'print'):
+        return 'visualizations'
+    return os.path.join('visualizations', output_profile)
+
+def job_outputs(job, output_profile=None):
+    """Files a job writes with ``output_profile``; images take the profile's extension."""
+    outputs = [os.path.join(output_dir(output_profile), os.path.basename(path)) for path in job.outputs]
+    return tuple(plot_config.profile_path(path, output_profile) if path.endswith('.png') else path for path in outputs)
+
+def manifest_key(name, output_profile=None):
+    # Print output keeps the plain job name, so existing manifests stay valid
+    return name if output_profile in (None, 'print') else f'{name}@{output_profile}'
+
+def _project_module(name):
+    """Path of the project module ``name`` (None for the standard library and third-party packages)."""
+    path = name.split('.')[0] + '.py' if name else None
+    return path if path and os.path.exists(path) else None
+
+@lru_cache(maxsize=None)
+def _parse(path):
+    with open(path) as f:
+        source = f.read()
+    return ast.parse(source, path)
+
+def _imported_modules(node):
+    """Project modules imported anywhere inside ``node``."""
+    modules = set()
+    for sub in ast.walk(node):
+        if isinstance(sub, ast.Import):
+            modules.update(_project_module(alias.name) for alias in sub.names)
+        elif isinstance(sub, ast.ImportFrom) and not sub.level:
+            modules.add(_project_module(sub.module))
+    modules.discard(None)
+    return modules
+
+@lru_cache(maxsize=None)
+def module_dependencies(path):
+    """``path`` and every project module it imports, directly or not, including imports inside functions."""
+    closure, todo = set(), [path]
+    while todo:
+        current = todo.pop()
+        if current not in closure:
+            closure.add(current)
+            todo.extend(_imported_modules(_parse(current)))
+    return frozenset(closure)
+
+@lru_cache(maxsize=None)
+def _top_level_names(path):
+    names = set()
+    for node in _parse(path).body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names.update(sub.id for target in targets for sub in ast.walk(target) if isinstance(sub, ast.Name))
+    return names
+
+def chart_dependencies(module, function):
+    """Source of ``function`` and the module-level definitions it uses, and the project modules they need.
+
+    Names are followed through the chart module: module-level functions,
+    classes and constants it refers to are included (as normalized source,
+    so comments and formatting do not count), and names imported from a
+    project module (also through ``import *``) pull in that module with
+    everything it imports. Other charts of the same module are not included.
+    """
+    path = module + '.py'
+    tree = _parse(path)
+    definitions, imported, star = {}, {}, []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            definitions[node.name] = node
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                for sub in ast.walk(target):
+                    if isinstance(sub, ast.Name):
+                        definitions[sub.id] = node
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                imported[alias.asname or alias.name.split('.')[0]] = alias.name
+        elif isinstance(node, ast.ImportFrom) and not node.level:
+            for alias in node.names:
+                if alias.name == '*':
+                    star.append(node.module)
+                else:
+                    imported[alias.asname or alias.name] = node.module
+
+    sources, modules, seen, todo = [], set(), set(), [function]
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        if name in definitions:
+            node = definitions[name]
+            sources.append(ast.unparse(node))
+            modules.update(_imported_modules(node))
+            todo.extend(sub.id for sub in ast.walk(node) if isinstance(sub, ast.Name))
+        elif name in imported:
+            modules.add(_project_module(imported[name]))
+        else:
+            modules.update(_project_module(m) for m in star if _project_module(m) and name in _top_level_names(_project_module(m)))
+    modules.discard(None)
+    files = set()
+    for dependency in modules:
+        files |= module_dependencies(dependency)
+    return sorted(set(sources)), sorted(files)
+
+def job_fingerprint(job, cube, output_profile=None):
+    """Hash of everything a chart depends on: data, parameters, code, style and output profile."""
+    import pandas as pd
+
+    digest = hashlib.sha256()
+    digest.update(f'{job.module}.{job.function}'.encode())
+    if output_profile not in (None, 'print'):
+        digest.update(output_profile.encode())
+    digest.update(json.dumps(job.kwargs, sort_keys=True, default=list).encode())
+    sources, modules = chart_dependencies(job.module, job.function)
+    for source in sources:
+        digest.update(source.encode())
+    if cube is not None:
+        # Code that builds the visitor roll-ups
+        modules = sorted(set(modules) | module_dependencies('visitor_cube.py'))
+    for path in sorted(set(modules) | {STYLE_PATH}):
+        _hash_file(digest, path)
+    for path in job.inputs:
+        _hash_file(digest, path)
+    if cube is not None:
+        digest.update(json.dumps(list(cube.data.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(cube.data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+class ChartRenderError(RuntimeError):
+    """Raised after a run in which some charts failed; the others were still rendered and recorded."""
+
+    def __init__(self, failures, timings):
+        super().__init__(f"{len(failures)} chart(s) failed: {', '.join(failures)}")
+        self.failures = failures
+        self.timings = timings
+
+def render_charts(names=None, workers=None, force=False, output_profile=None):
+    """Render the named charts (all by default) across ``workers`` processes.
+
+    Charts whose fingerprint matches the build manifest and whose outputs exist
+    are skipped unless ``force`` is set. ``output_profile`` names one of
+    plot_config.OUTPUT_PROFILES (default: plot_config.OUTPUT_PROFILE). A failing
+    chart does not stop the others; once every job has finished,
+    ChartRenderError lists the failures (job name -> exception).
+
+    Parallel jobs (the bar chart race) start first, each in a process of its
+    own outside the chart pool, and split the workers the chart pool does not
+    use (all but CHART_POOL_SHARE of them while other charts are stale).
+    """
+    output_profile = output_profile or plot_config.OUTPUT_PROFILE
+    plot_config.get_profile(output_profile)  # fail early on an unknown name
+    names = list(JOBS) if not names else [name for name in JOBS if name in names]
+    os.makedirs('visualizations', exist_ok=True)
+    slices = _job_slices(names)
+    manifest = load_manifest()
+    fingerprints = {name: job_fingerprint(JOBS[name], slices[name], output_profile) for name in names}
+    stale = [
+        name for name in names
+        if force or manifest.get(manifest_key(name, output_profile)) != fingerprints[name]
+        or not all(os.path.exists(path) for path in job_outputs(JOBS[name], output_profile))
+    ]
+    for name in names:
+        if name not in stale:
+            print(f'{name} up to date')
+    timings = {}
+    failures = {}
+    if not stale:
+        return timings
+    parallel = [name for name in stale if JOBS[name].parallel]
+    pooled = [name for name in stale if not JOBS[name].parallel]
+    total = workers or os.cpu_count()
+    chart_workers = min(len(pooled), max(1, round(total * CHART_POOL_SHARE)) if parallel else total)
+    with ExitStack() as pools:
+        futures = {}
+        if parallel:
+            job_workers = max(1, (total - chart_workers) // len(parallel))
+            pool = pools.enter_context(ProcessPoolExecutor(max_workers=len(parallel), initializer=_init_worker))
+            futures.update({pool.submit(_run_job, name, JOBS[name], slices[name], output_profile, job_workers): name
+                            for name in parallel})
+        if pooled:
+            pool = pools.enter_context(ProcessPoolExecutor(max_workers=chart_workers, initializer=_init_worker))
+            futures.update({pool.submit(_run_job, name, JOBS[name], slices[name], output_profile): name
+                            for name in pooled})
+        for future in as_completed(futures):
+            try:
+                name, seconds, records = future.result()
+            except Exception as exc:
+                failures[futures[future]] = exc
+                print(f'{futures[future]} failed: {type(exc).__name__}: {exc}')
+                continue
+            timings[name] = seconds
+            instrumentation.add_records(records)
+            # Record each chart as soon as it is written so an interrupted run keeps its progress
+            manifest[manifest_key(name, output_profile)] = fingerprints[name]
+            save_manifest(manifest)
+            print(f'{name} rendered in {seconds:.1f}s')
+    if failures:
+        raise ChartRenderError(failures, timings)
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Render the Japan Tourism charts in parallel.')
+    parser.add_argument('jobs', nargs='*', metavar='job', help='charts to render (default: all)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='worker processes (default: CPU count)')
+    parser.add_argument('-f', '--force', action='store_true', help='re-render even if inputs are unchanged')
+    parser.add_argument('--list', action='store_true', help='list the available chart jobs and exit')
+    parser.add_argument('-o', '--output-profile', choices=sorted(plot_config.OUTPUT_PROFILES),
+                        help='image format/resolution preset (default: print, or $TOURISM_OUTPUT_PROFILE)')
+    parser.add_argument('--timing', action='store_true', help='print per-stage wall/CPU time and peak memory')
+    parser.add_argument('--timing-json', metavar='PATH', help='also save the stage timings as JSON (implies --timing)')
+    parser.add_argument('--profile', metavar='DIR', help='write a cProfile dump per chart into DIR')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, job in JOBS.items():
+            print(f'{name:24s} {job.module}.{job.function}')
+    else:
+        unknown = sorted(set(args.jobs) - set(JOBS))
+        if unknown:
+            parser.error(f"unknown job(s): {', '.join(unknown)}; see --list")
+        if args.timing or args.timing_json or args.profile:
+            # Set before the pool starts so the workers inherit it
+            instrumentation.enable(args.profile)
+        start = time.perf_counter()
+        try:
+            render_charts(args.jobs, args.workers, args.force, args.output_profile)
+            failed = None
+        except ChartRenderError as error:
+            failed = error
+        if failed:
+            print(f'\n{failed} ({time.perf_counter() - start:.1f}s)')
+        else:
+            print(f'\nAll charts rendered in {time.perf_counter() - start:.1f}s')
+        if instrumentation.enabled():
+            print()
+            instrumentation.write_summary(args.timing_json)
+        if failed:
+            raise SystemExit(1)
@@ -0,0 +1,274 @@
+"""
+Long-running report server for the Japan Tourism charts.
+Worker processes load the visitor cube, its roll-ups and the prefecture
+geometry once, import every chart module and warm matplotlib's font cache;
+requests are then rendered on that pool without paying import or parse costs.
+Rendered files are cached by chart name and normalized parameters.
+
+Endpoints:
+    GET  /charts                       chart names and their parameters (JSON)
+    GET  /charts/<chart>?param=value   rendered image; values are JSON literals
+                                       (``?top_n=15``, ``?formats=["gif"]``), and
+                                       ``ext`` picks one file of a multi-file chart;
+                                       ``profile`` picks the output profile
+                                       (``?profile=preview``, default: print)
+    POST /reload                       drop the cache and restart the workers
+                                       (e.g. after new data was cleaned)
+
+Usage:
+    python report_server.py --port 8050 --workers 4
+"""
+
+import argparse
+import atexit
+import inspect
+import json
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import charts
+import plot_config
+
+# Parameters that cannot come from a URL: in-memory objects, output
+# locations and nested worker pools
+SERVER_ONLY_PARAMS = {'cube', 'output_path', 'workers'}
+# Processes a chart that runs its own pool (the bar chart race) may start; set
+# per render worker to its share of the cores so nested pools never oversubscribe
+NESTED_WORKERS = 1
+
+def _init_worker(pool_size=None):
+    """Load data, chart modules and fonts once per worker process."""
+    import importlib
+    import matplotlib
+    matplotlib.use('Agg')
+
+    global NESTED_WORKERS
+    NESTED_WORKERS = max(1, os.cpu_count() // (pool_size or os.cpu_count()))
+
+    # Each worker renders into its own directory so concurrent requests never collide
+    plot_config.OUTPUT_DIR = tempfile.mkdtemp(prefix='tourism-report-')
+    atexit.register(shutil.rmtree, plot_config.OUTPUT_DIR, ignore_errors=True)
+    for module in set(charts.CHARTS.values()):
+        importlib.import_module(module)
+
+    from visitor_cube import load_classified_cube, load_cube
+    load_cube()
+    load_classified_cube()
+    from geometry_cache import SHAPEFILE_PATH, GEOMETRY_CACHE_PATH, load_geometry
+    if os.path.exists(SHAPEFILE_PATH.format(level=1)) or os.path.exists(GEOMETRY_CACHE_PATH.format(level=1)):
+        load_geometry(1)
+
+    plot_config.resolve_fonts()
+    plt = plot_config.pyplot()
+    fig = plt.figure()
+    fig.text(.25, .5, 'warm up', **plot_config.STANDARD_FONT_CONFIG)
+    fig.text(.75, .5, 'warm up', fontweight='bold')
+    fig.canvas.draw()
+    plt.close(fig)
+
+class ChartArgumentError(ValueError):
+    """A chart rejected the values it was called with (reported as 400, not 500)."""
+
+def _render(name, params, profile='print'):
+    """Run one chart in a worker and return {filename: bytes} of what it wrote.
+
+    Lookup, value and arithmetic errors raised for non-default parameters
+    (e.g. a year without data) are re-raised as ChartArgumentError. Charts
+    with a ``workers`` parameter get NESTED_WORKERS, never their own default.
+    """
+    plot_config.OUTPUT_PROFILE = profile
+    out = plot_config.OUTPUT_DIR
+    for filename in os.listdir(out):
+        os.remove(os.path.join(out, filename))
+    func = getattr(charts, name).load()
+    if 'workers' in inspect.signature(func).parameters:
+        params = dict(params, workers=NESTED_WORKERS)
+    try:
+        func(**params)
+    except (ArithmeticError, KeyError, IndexError, TypeError, ValueError) as exc:
+        defaults = chart_parameters(name)
+        changed = sorted(key for key, value in params.items()
+                         if key not in SERVER_ONLY_PARAMS and value != defaults.get(key))
+        if not changed:
+            raise
+        raise ChartArgumentError(f"{', '.join(changed)} rejected by {name}: {type(exc).__name__}: {exc}") from None
+    files = {}
+    for filename in sorted(os.listdir(out)):
+        with open(os.path.join(out, filename), 'rb') as f:
+            files[filename] = f.read()
+    return files
+
+def chart_parameters(name):
+    """URL-settable parameters of a chart and their defaults."""
+    signature = inspect.signature(getattr(charts, name).load())
+    return {
+        param.name: (None if param.default is inspect.Parameter.empty else param.default)
+        for param in signature.parameters.values() if param.name not in SERVER_ONLY_PARAMS
+    }
+
+def _check_type(key, value, default):
+    """Raise TypeError unless ``value`` has the type of the parameter's default (any type without one)."""
+    if default is None or value is None:
+        return
+    if isinstance(default, (tuple, list, range)):
+        if not isinstance(value, (tuple, list)):
+            raise TypeError(f'{key} must be a list, got {value!r}')
+        for item in value:
+            if len(default):
+                _check_type(key, item, default[0])
+        return
+    expected = (int, float) if isinstance(default, float) else type(default)
+    # bool is an int subclass; neither may stand in for the other
+    if not isinstance(value, expected) or isinstance(value, bool) != isinstance(default, bool):
+        raise TypeError(f'{key} must be {type(default).__name__}, got {value!r}')
+
+def normalize_params(name, params):
+    """Bind ``params`` to the chart's signature with defaults filled in.
+
+    Raises TypeError for unknown or server-only parameters, and for values
+    whose type differs from the parameter's default.
+    """
+    blocked = SERVER_ONLY_PARAMS & set(params)
+    if blocked:
+        raise TypeError(f"parameter(s) not settable over HTTP: {', '.join(sorted(blocked))}")
+    bound = inspect.signature(getattr(charts, name).load()).bind(**params)
+    defaults = chart_parameters(name)
+    for key, value in bound.arguments.items():
+        _check_type(key, value, defaults.get(key))
+    bound.apply_defaults()
+    return {key: value for key, value in bound.arguments.items() if key not in SERVER_ONLY_PARAMS}
+
+class RenderCache:
+    """LRU of rendered charts keyed by chart name and normalized parameters.
+
+    Entries are futures, so identical requests arriving together share one render.
+    """
+
+    def __init__(self, workers=None, maxsize=256):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.pool = self._start_pool()
+
+    def _start_pool(self):
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.workers,))
+        # Workers are spawned on demand; start (and warm) all of them up front
+        for _ in range(self.workers or os.cpu_count()):
+            pool.submit(os.getpid)
+        return pool
+
+    def render(self, name, params, profile='print'):
+        """Files written by chart ``name`` for ``params`` (as returned by normalize_params)
+        with output profile ``profile``."""
+        key = (name, profile, json.dumps(params, sort_keys=True, default=list))
+        with self.lock:
+            future = self.entries.get(key)
+            if future is None:
+                future = self.entries[key] = self.pool.submit(_render, name, params, profile)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+            else:
+                self.entries.move_to_end(key)
+        try:
+            return future.result()
+        except Exception:
+            with self.lock:
+                if self.entries.get(key) is future:
+                    del self.entries[key]
+            raise
+
+    def reload(self):
+        """Forget every cached render and restart the workers so they reload the data."""
+        with self.lock:
+            old, self.pool = self.pool, self._start_pool()
+            self.entries.clear()
+        old.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+def _parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+class ReportHandler(BaseHTTPRequestHandler):
+    cache = None  # set by make_server
+
+    def _send(self, status, body, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, indent=2, default=list).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        if parts in ([], ['charts']):
+            return self._send(200, {name: chart_parameters(name) for name in charts.CHARTS})
+        if len(parts) != 2 or parts[0] != 'charts' or parts[1] not in charts.CHARTS:
+            return self._send(404, {'error': f'unknown chart: {url.path}'})
+
+        params = {key: _parse_value(value) for key, value in parse_qsl(url.query)}
+        ext = params.pop('ext', None)
+        profile = str(params.pop('profile', 'print'))
+        if profile not in plot_config.OUTPUT_PROFILES:
+            return self._send(400, {'error': f'unknown output profile: {profile}', 'profiles': sorted(plot_config.OUTPUT_PROFILES)})
+        try:
+            params = normalize_params(parts[1], params)
+        except TypeError as exc:
+            return self._send(400, {'error': str(exc)})
+        try:
+            files = self.cache.render(parts[1], params, profile)
+        except ChartArgumentError as exc:
+            return self._send(400, {'error': str(exc)})
+        except Exception as exc:
+            return self._send(500, {'error': f'{type(exc).__name__}: {exc}'})
+
+        names = [name for name in files if ext is None or name.endswith(f'.{ext}')]
+        if not names:
+            return self._send(404, {'error': f'chart produced no .{ext} file', 'files': list(files)})
+        filename = names[0]
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        self._send(200, files[filename], content_type)
+
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip('/') != '/reload':
+            return self._send(404, {'error': f'unknown endpoint: {self.path}'})
+        self.cache.reload()
+        self._send(200, {'reloaded': True})
+
+def make_server(host='127.0.0.1', port=8050, workers=None, cache_size=256):
+    """Build the HTTP server and its warm render pool (call serve_forever() to run)."""
+    handler = type('Handler', (ReportHandler,), {'cache': RenderCache(workers, cache_size)})
+    return ThreadingHTTPServer((host, port), handler)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve the Japan Tourism charts over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1', help='interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8050, help='port to listen on (default: 8050)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='render processes (default: CPU count)')
+    parser.add_argument('--cache-size', type=int, default=256, help='rendered charts kept in memory')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.workers, args.cache_size)
+    print(f'Serving charts on http://{args.host}:{args.port}/charts')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.RequestHandlerClass.cache.close()
+        server.server_close()
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# The project modules are top-level scripts run from the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture
+def in_repo(monkeypatch):
+    """Run from the repository root, where the modules' relative data paths resolve."""
+    monkeypatch.chdir(ROOT)
+    return ROOT
@@ -0,0 +1,68 @@
+import csv
+
+import pandas as pd
+import pytest
+
+from clean_visitors_csv import INPUT_PATH, clean_visitors, clean_visitors_streaming, ingest_visitors
+from dimensions import MONTH_NAMES
+from visitor_data import update_visitor_cache, write_visitor_cache
+
+@pytest.fixture
+def rows(in_repo):
+    with open(INPUT_PATH, newline='') as f:
+        return list(csv.reader(f))
+
+def write_input(path, rows):
+    with open(path, 'w', newline='') as f:
+        csv.writer(f, lineterminator='\n').writerows(rows)
+    return path
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def restate(rows, year, month, delta=7):
+    """Copy of ``rows`` with the first figure of (year, month) changed by ``delta``."""
+    rows = [list(row) for row in rows]
+    for row in rows[2:]:
+        if row[:2] == [str(year), month]:
+            row[2] = f'{int(row[2].replace(",", "")) + delta:,}'
+            return rows
+    raise AssertionError(f'no row for {month} {year}')
+
+@pytest.mark.parametrize('chunksize', [1, 7, 120])
+def test_streaming_matches_full_clean(tmp_path, rows, chunksize):
+    source = write_input(tmp_path / 'input.csv', rows)
+    clean_visitors(source, tmp_path / 'full.csv')
+    offsets = clean_visitors_streaming(source, tmp_path / 'stream.csv', chunksize)
+
+    streamed = read_bytes(tmp_path / 'stream.csv')
+    assert streamed == read_bytes(tmp_path / 'full.csv')
+    first_year = min(offsets, key=int)
+    assert streamed[offsets[first_year]:].startswith(f'{first_year},'.encode())
+
+def test_incremental_ingest_matches_full_clean(tmp_path, rows):
+    source = tmp_path / 'input.csv'
+    output, state, cache = tmp_path / 'cleaned.csv', tmp_path / 'state.json', tmp_path / 'cleaned.feather'
+
+    write_input(source, rows[:-3])
+    assert ingest_visitors(source, output, state, chunksize=50)['mode'] == 'full'
+    write_visitor_cache(output, cache)
+
+    # A new release: three new months and a restated one
+    year, month = rows[-20][:2]
+    write_input(source, restate(rows, year, month))
+    summary = ingest_visitors(source, output, state, chunksize=50)
+    assert summary['mode'] == 'delta'
+    assert len(summary['new']) == 3
+    assert summary['restated'] == [f'{year}-{MONTH_NAMES.index(month) + 1:02d}']
+    assert summary['years'][0] == int(year)
+
+    clean_visitors(source, tmp_path / 'full.csv')
+    assert read_bytes(output) == read_bytes(tmp_path / 'full.csv')
+
+    update_visitor_cache(summary['years'][0], summary['offset'], output, cache)
+    write_visitor_cache(output, tmp_path / 'full.feather')
+    pd.testing.assert_frame_equal(pd.read_feather(cache), pd.read_feather(tmp_path / 'full.feather'))
+
+    assert ingest_visitors(source, output, state, chunksize=50)['mode'] == 'current'
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from growth_analytics import GrowthMatrix
+
+@pytest.fixture
+def matrix():
+    # b has no 2020 value
+    return GrowthMatrix(['a', 'b'], [2018, 2020, 2022], [[100.0, 121.0, 144.0], [50.0, np.nan, 25.0]])
+
+def test_from_long_sums_duplicates_and_fills_gaps():
+    df = pd.DataFrame({'country': ['a', 'a', 'b', 'a'], 'year': [2020, 2020, 2021, 2021], 'tourist': [1, 2, 5, 4]})
+    growth = GrowthMatrix.from_long(df, 'country', 'year', 'tourist')
+    assert list(growth.entities) == ['a', 'b']
+    np.testing.assert_array_equal(growth.years, [2020, 2021])
+    np.testing.assert_array_equal(growth.values, [[3.0, 4.0], [np.nan, 5.0]])
+
+def test_period_growth(matrix):
+    np.testing.assert_allclose(matrix.period_growth(2018, 2022), [44.0, -50.0])
+    assert np.isnan(matrix.period_growth(2018, 2020)[1])
+    with pytest.raises(KeyError):
+        matrix.period_growth(2018, 2019)
+
+def test_cagr(matrix):
+    np.testing.assert_allclose(matrix.cagr(2018, 2022), [(1.44 ** 0.25 - 1) * 100, (0.5 ** 0.25 - 1) * 100])
+    np.testing.assert_allclose(matrix.cagr(2018, 2020)[0], 10.0)
+
+def test_pairwise_growth_matches_period_growth(matrix):
+    growth = matrix.pairwise_growth()
+    assert growth.shape == (2, 3, 3)
+    np.testing.assert_allclose(growth[:, 0, 2], matrix.period_growth(2018, 2022))
+    np.testing.assert_allclose(growth[:, 2, 0], matrix.period_growth(2022, 2018))
+    np.testing.assert_array_equal(np.diagonal(growth[0]), [0.0, 0.0, 0.0])
+
+def test_pairwise_growth_annualized(matrix):
+    growth = matrix.pairwise_growth(annualized=True)
+    np.testing.assert_allclose(growth[:, 0, 2], matrix.cagr(2018, 2022))
+    np.testing.assert_allclose(growth[0, 1, 2], matrix.cagr(2020, 2022)[0])
+    # Only pairs with target after base have a rate, the diagonal included
+    below = np.tril(np.ones((3, 3), dtype=bool))
+    assert np.isnan(growth[:, below]).all()
@@ -0,0 +1,23 @@
+import numpy as np
+
+from heatmaps import block_shape, downsample, share_matrix
+
+def test_share_matrix_sums_cells_as_row_shares():
+    rows = [0, 0, 0, 1, 1]
+    cols = [0, 1, 1, 0, 2]
+    values = [10.0, 5.0, 5.0, 3.0, 1.0]
+    shares = share_matrix(rows, cols, values, (2, 3))
+    np.testing.assert_allclose(shares, [[50.0, 50.0, np.nan], [75.0, np.nan, 25.0]])
+
+def test_share_matrix_skips_missing_codes_and_values():
+    shares = share_matrix([0, -1, 0, 0], [0, 0, -1, 1], [1.0, 100.0, 100.0, np.nan], (1, 2))
+    np.testing.assert_allclose(shares, [[100.0, np.nan]])
+
+def test_share_matrix_rows_without_a_total_are_nan():
+    shares = share_matrix([0, 0, 1], [0, 1, 1], [0.0, 0.0, 2.0], (3, 2))
+    np.testing.assert_allclose(shares, [[np.nan, np.nan], [np.nan, 100.0], [np.nan, np.nan]])
+
+def test_downsample_ignores_nan_and_keeps_partial_blocks():
+    matrix = np.array([[1.0, 3.0, 5.0], [np.nan, 5.0, np.nan]])
+    assert block_shape(matrix.shape, (1, 2)) == (2, 2)
+    np.testing.assert_allclose(downsample(matrix, (2, 2)), [[3.0, 5.0]])
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from label_layout import layout_callouts
+
+def label_boxes(label_x, label_y, width, height):
+    return np.column_stack([label_x - width / 2, label_y - height / 2, label_x + width / 2, label_y + height / 2])
+
+@pytest.mark.parametrize('seed', range(5))
+def test_layout_callouts_has_no_overlaps(seed):
+    rng = np.random.default_rng(seed)
+    n = 40
+    x, y = rng.uniform(0, 100, n), rng.uniform(0, 100, n)
+    width = rng.uniform(2, 6, n)
+    height = np.full(n, 1.5)
+    label_x, label_y = layout_callouts(x, y, width, height, distance=4)
+
+    boxes = label_boxes(label_x, label_y, width, height)
+    x0, y0, x1, y1 = boxes.T
+    overlaps = (x0[:, None] <= x1[None, :]) & (x0[None, :] <= x1[:, None]) \
+        & (y0[:, None] <= y1[None, :]) & (y0[None, :] <= y1[:, None])
+    np.fill_diagonal(overlaps, False)
+    assert not overlaps.any()
+    covers = (x0[:, None] <= x[None, :]) & (x[None, :] <= x1[:, None]) & (y0[:, None] <= y[None, :]) & (y[None, :] <= y1[:, None])
+    assert not covers.any()
+
+def test_layout_callouts_points_away_from_the_center():
+    label_x, label_y = layout_callouts([0.0, 10.0], [0.0, 0.0], 1.0, 1.0, distance=2)
+    assert label_x[0] < 0 < 10 < label_x[1]
+
+def test_layout_callouts_places_every_label_when_crowded():
+    x = np.zeros(30)
+    label_x, label_y = layout_callouts(x, x, 5.0, 5.0, distance=1)
+    assert label_x.shape == label_y.shape == (30,)
+    assert np.isfinite(label_x).all() and np.isfinite(label_y).all()
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from rate_tables import YEARLY, AsOfTable
+
+@pytest.fixture
+def yearly():
+    return AsOfTable([2020, 2021, 2022], {'rate': [1.0, 2.0, 4.0]})
+
+@pytest.fixture
+def keyed():
+    return AsOfTable([2020, 2021, 2019, 2022], {'cpi': [10.0, 20.0, 1.0, 2.0]}, keys=['A', 'A', 'B', 'B'])
+
+def test_lookup_at_table_boundaries(yearly):
+    dates = ['2019-12-31', '2020-01-01', '2021-12-31', '2022-01-01', '2030-06-01']
+    np.testing.assert_array_equal(yearly.lookup(dates), [np.nan, 1.0, 2.0, 4.0, 4.0])
+
+def test_lookup_expires_entries_with_valid_for(yearly):
+    dates = ['2022-12-31', '2023-01-01']
+    np.testing.assert_array_equal(yearly.lookup(dates, valid_for=YEARLY), [4.0, np.nan])
+
+def test_lookup_accepts_years_and_mixed_dates(yearly):
+    np.testing.assert_array_equal(yearly.lookup([2021, '2022-03-01']), [2.0, 4.0])
+
+def test_keyed_lookup_stays_within_each_key(keyed):
+    # 2019 is before A's first entry even though B has one by then
+    values = keyed.lookup([2019, 2019, 2021, 2030, 2021], keys=['A', 'B', 'B', 'A', 'C'])
+    np.testing.assert_array_equal(values, [np.nan, 1.0, 1.0, 20.0, np.nan])
+
+def test_keyed_lookup_requires_keys(keyed):
+    with pytest.raises(ValueError):
+        keyed.lookup([2020])
+
+def test_rebase_at_table_boundaries(keyed):
+    amounts = [100.0, 100.0, 100.0]
+    # Amounts at the base date are unchanged; dates before the key's first entry have no rate
+    rebased = keyed.rebase(amounts, [2021, 2020, 2019], base=2021, keys=['A', 'A', 'A'])
+    np.testing.assert_array_equal(rebased, [100.0, 200.0, np.nan])
+    before_start = keyed.rebase(amounts, [2020, 2021, 2022], base=2018, keys=['A', 'B', 'B'])
+    assert np.isnan(before_start).all()
@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import render_charts
+
+JOBS = ['total_visitors_growth', 'anime_market', 'manga_market']
+
+@pytest.fixture
+def runner(in_repo, monkeypatch):
+    """render_charts with an in-memory manifest and jobs that only record that they ran."""
+    manifest, rendered, failing = {}, [], set()
+
+    def run_job(name, job, cube, output_profile=None, workers=None):
+        if name in failing:
+            raise RuntimeError(f'{name} broke')
+        rendered.append((name, workers) if job.parallel else name)
+        return name, 0.0, []
+
+    monkeypatch.setattr(render_charts, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(render_charts, '_run_job', run_job)
+    monkeypatch.setattr(render_charts, 'load_manifest', lambda: dict(manifest))
+    monkeypatch.setattr(render_charts, 'save_manifest', lambda new: manifest.update(new))
+    return manifest, rendered, failing
+
+def test_unchanged_charts_are_skipped(runner):
+    manifest, rendered, _ = runner
+    render_charts.render_charts(JOBS, workers=1)
+    assert sorted(rendered) == sorted(JOBS)
+    assert set(manifest) == set(JOBS)
+
+    rendered.clear()
+    assert render_charts.render_charts(JOBS, workers=1) == {}
+    assert rendered == []
+
+def test_changed_fingerprint_and_force_rerender(runner):
+    manifest, rendered, _ = runner
+    render_charts.render_charts(JOBS, workers=1)
+    manifest['anime_market'] = 'outdated'
+
+    rendered.clear()
+    render_charts.render_charts(JOBS, workers=1)
+    assert rendered == ['anime_market']
+
+    rendered.clear()
+    render_charts.render_charts(['manga_market'], workers=1, force=True)
+    assert rendered == ['manga_market']
+
+def test_failed_chart_does_not_stop_the_others(runner):
+    manifest, rendered, failing = runner
+    failing.add('anime_market')
+    with pytest.raises(render_charts.ChartRenderError) as error:
+        render_charts.render_charts(JOBS, workers=1)
+    assert set(error.value.failures) == {'anime_market'}
+    assert sorted(rendered) == ['manga_market', 'total_visitors_growth']
+    assert set(manifest) == {'manga_market', 'total_visitors_growth'}
+
+def test_parallel_job_gets_the_workers_the_chart_pool_leaves_free(runner):
+    _, rendered, _ = runner
+    render_charts.render_charts(['barchart_race'] + JOBS, workers=8)
+    assert ('barchart_race', 6) in rendered
+
+    rendered.clear()
+    render_charts.render_charts(['barchart_race'], workers=8, force=True)
+    assert rendered == [('barchart_race', 8)]
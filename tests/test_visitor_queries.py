@@ -0,0 +1,25 @@
+import pytest
+
+from visitor_queries import COVID_YEARS, growth, top_countries, yearly_breakdown
+
+@pytest.fixture
+def cube(in_repo):
+    from visitor_cube import load_classified_cube
+    return load_classified_cube()
+
+def test_windows_must_have_data(cube):
+    with pytest.raises(KeyError, match='1990'):
+        top_countries([1990, 2019], cube=cube)
+    with pytest.raises(ValueError):
+        top_countries([], cube=cube)
+    with pytest.raises(ValueError):
+        yearly_breakdown('country', COVID_YEARS, exclude=COVID_YEARS, cube=cube)
+    # Excluded years need not have data
+    assert list(yearly_breakdown('country', [2019, 1990], exclude=[1990], cube=cube).index) == [2019]
+
+def test_n_must_be_positive(cube):
+    assert len(top_countries([2019], n=3, cube=cube)) == 3
+    assert len(top_countries([2019], n=None, cube=cube)) > 3
+    for query in (lambda: top_countries([2019], n=0, cube=cube), lambda: growth(2011, 2024, n=0, cube=cube)):
+        with pytest.raises(ValueError):
+            query()
@@ -1,19 +1,17 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
 from plot_config import *
+from instrumentation import chart
 
-# Ensure visualizations folder exists
-if not os.path.exists('visualizations'):
-    os.makedirs('visualizations')
-
+@chart
 def plot_visit_motivation():
+    plt = pyplot()
     df = pd.read_csv('raw_data/purpose_of_visit_2024.csv')
     filtered_df = df[df['Item2'] == 'What did you do during your current stay in Japan?']
     filtered_df = filtered_df.sort_values('Composition ratio', ascending=False)
     top_10_data = filtered_df.head(10).reset_index(drop=True)
 
-    plt.figure(figsize=(12, 7))
+    styled_figure((12, 7), title='Top 10 Activities Tourists Did During Their Stay in Japan (2024)', xlabel='Participation Rate')
     bars = plt.barh(
         top_10_data['Item1'][::-1],  # reverse for descending order
         top_10_data['Composition ratio'][::-1],
@@ -21,14 +19,14 @@ def plot_visit_motivation():
         alpha=0.85,
         edgecolor='black' 
     )
-    plt.xlabel('Participation Rate', **STANDARD_LABEL_CONFIG)
-    plt.title('Top 10 Activities Tourists Did During Their Stay in Japan (2024)', **STANDARD_TITLE_CONFIG)
     plt.tight_layout()
     for bar, value in zip(bars, top_10_data['Composition ratio'][::-1]):
         plt.text(bar.get_width() + 1, bar.get_y() + bar.get_height()/2, f'{value:.0f}%', va='center', fontsize=12, fontweight='bold')
-    plt.savefig('visualizations/visit_motivation.png', **STANDARD_FIGURE_CONFIG)
+    path = save_figure('visit_motivation.png')
     plt.close()
-    print("Bar chart saved as 'visualizations/visit_motivation.png'")
+    print(f"Bar chart saved as '{path}'")
 
 if __name__ == "__main__":
+    # Ensure visualizations folder exists
+    os.makedirs('visualizations', exist_ok=True)
     plot_visit_motivation()
\ No newline at end of file
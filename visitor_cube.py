@@ -0,0 +1,95 @@
+"""
+Pre-aggregated visitor counts shared by the charts.
+VisitorCube sums the cleaned visitor data once on (year, month, country, region);
+roll-ups along any subset of those dimensions are derived from the cube, or from
+a finer roll-up already computed, and cached.
+"""
+
+from functools import lru_cache
+
+from dimensions import unclassified_mask
+from instrumentation import stage
+from visitor_data import CLEANED_CACHE_PATH, CLEANED_CSV_PATH, load_visitors
+
+DIMENSIONS = ['year', 'month', 'country', 'region']
+MEASURES = ['tourist', 'business', 'total']
+
+class VisitorCube:
+    """Visitor counts summed on (year, month, country, region)."""
+
+    def __init__(self, data, measures=MEASURES, dimensions=DIMENSIONS):
+        self.data = data
+        self.measures = list(measures)
+        self.dimensions = list(dimensions)
+        self._rollups = {}
+
+    @classmethod
+    @stage('build_cube')
+    def from_frame(cls, df, measures=MEASURES):
+        """Build the cube with a single groupby over the cleaned visitor frame."""
+        data = df.groupby(DIMENSIONS, observed=True)[list(measures)].sum().reset_index()
+        # Counts loaded from the Feather cache are Arrow-backed; the cube is Int64 either way
+        return cls(data.astype({measure: 'Int64' for measure in measures}), measures)
+
+    def where(self, mask):
+        """Return a new cube restricted to the rows of ``data`` selected by ``mask``."""
+        data = self.data[mask].reset_index(drop=True)
+        for col in data.select_dtypes('category'):
+            data[col] = data[col].cat.remove_unused_categories()
+        return VisitorCube(data, self.measures, self.dimensions)
+
+    def project(self, *dims, measures=None):
+        """Return a smaller cube holding only the roll-up on ``dims``.
+
+        Used to hand a chart exactly the slice it needs, e.g. to a worker process;
+        ``measures`` optionally narrows the measures kept as well.
+        """
+        key = tuple(d for d in self.dimensions if d in dims)
+        measures = self.measures if measures is None else list(measures)
+        data = self.rollup(*key)[measures].reset_index()
+        return VisitorCube(data, measures, key)
+
+    def rollup(self, *dims):
+        """Sum the measures over every dimension not in ``dims``.
+
+        The result is indexed by ``dims`` (in cube order) and is cached, so
+        callers must not modify it in place.
+        """
+        unknown = set(dims) - set(self.dimensions)
+        if unknown:
+            raise ValueError(f'Unknown cube dimensions: {sorted(unknown)}')
+        key = tuple(d for d in self.dimensions if d in dims)
+        if key not in self._rollups:
+            with stage(f"rollup({', '.join(key)})"):
+                self._rollups[key] = self._aggregate(key)
+        return self._rollups[key]
+
+    def _aggregate(self, key):
+        # Start from the smallest cached roll-up that still has every requested dimension
+        sources = [k for k in self._rollups if set(key) <= set(k)]
+        if sources:
+            source = self._rollups[min(sources, key=lambda k: len(self._rollups[k]))]
+            if not key:
+                return source.sum()
+            return source.groupby(level=list(key), observed=True).sum()
+        if not key:
+            return self.data[self.measures].sum()
+        return self.data.groupby(list(key), observed=True)[self.measures].sum()
+
+def select_years(frame, years):
+    """Rows of a roll-up whose ``year`` index level is in ``years``."""
+    return frame[frame.index.get_level_values('year').isin(years)]
+
+@lru_cache(maxsize=None)
+def load_cube(csv_path=CLEANED_CSV_PATH, cache_path=CLEANED_CACHE_PATH):
+    """Cube over the full cleaned visitor data, built once per process."""
+    return VisitorCube.from_frame(load_visitors(csv_path, cache_path))
+
+def classified_cube(cube, max_year=2024):
+    """``cube`` without the 'Unclassified' catch-all countries, up to ``max_year``."""
+    return cube.where(~unclassified_mask(cube.data['country']) & (cube.data['year'] <= max_year))
+
+@lru_cache(maxsize=None)
+def load_classified_cube(max_year=2024):
+    """Cube without the 'Unclassified' catch-all countries, up to ``max_year``."""
+    return classified_cube(load_cube(), max_year)
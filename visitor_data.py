@@ -0,0 +1,94 @@
+"""
+Typed loading of the cleaned visitor data.
+The cleaner writes a Feather copy of cleaned_visitors.csv with compact column
+types; scripts load it memory-mapped whenever it is newer than the CSV. Loaded
+from the cache, the counts stay Arrow arrays and the year, date and category
+codes are NumPy views, all over the mapped file, so only the category labels
+are decoded into memory.
+"""
+
+import os
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from dimensions import MONTH_DTYPE
+from instrumentation import stage
+
+CLEANED_CSV_PATH = os.path.join('raw_data', 'cleaned_visitors.csv')
+CLEANED_CACHE_PATH = os.path.join('raw_data', 'cleaned_visitors.feather')
+
+COUNT_COLUMNS = ['total', 'tourist', 'business', 'others', 'short_excursion']
+# Dimension columns are parsed straight into categorical codes
+CSV_DTYPES = {'month': MONTH_DTYPE, 'country': 'category', 'region': 'category'}
+
+def to_typed_frame(df):
+    """Return the cleaned visitor frame with compact dtypes and a ``date`` column."""
+    df = df.copy()
+    df['year'] = df['year'].astype('int16')
+    df['month'] = df['month'].astype(MONTH_DTYPE)
+    df['country'] = df['country'].astype('category')
+    df['region'] = df['region'].astype('category')
+    for col in COUNT_COLUMNS:
+        df[col] = df[col].astype('Int64')
+    df['date'] = pd.to_datetime({'year': df['year'], 'month': df['month'].cat.codes + 1, 'day': 1})
+    return df
+
+@stage('write_visitor_cache')
+def write_visitor_cache(csv_path=CLEANED_CSV_PATH, cache_path=CLEANED_CACHE_PATH):
+    """Write the typed Feather copy of a cleaned visitor CSV."""
+    df = to_typed_frame(pd.read_csv(csv_path, dtype=CSV_DTYPES))
+    # Uncompressed so the file can be memory-mapped without decoding
+    df.to_feather(cache_path, compression='uncompressed')
+    return cache_path
+
+@stage('update_visitor_cache')
+def update_visitor_cache(first_year, offset, csv_path=CLEANED_CSV_PATH, cache_path=CLEANED_CACHE_PATH):
+    """Replace the years from ``first_year`` on in the Feather copy with the CSV rows from byte ``offset`` on.
+
+    For a CSV rewritten from ``offset`` (the start of ``first_year``) by an
+    incremental ingest: earlier years are kept from the cache, so only the
+    rewritten rows are parsed. The cache must be in step with the CSV before
+    the rewrite; without a cache the whole CSV is converted.
+    """
+    if not os.path.exists(cache_path):
+        return write_visitor_cache(csv_path, cache_path)
+    from pyarrow import feather
+    kept = feather.read_table(cache_path, memory_map=True).to_pandas()
+    kept = kept[kept['year'] < first_year]
+    with open(csv_path, newline='') as f:
+        columns = f.readline().rstrip('\r\n').split(',')
+        f.seek(offset)
+        rewritten = to_typed_frame(pd.read_csv(f, header=None, names=columns, dtype=CSV_DTYPES))
+    # Categories as a full conversion would infer them: the sorted values of the whole file
+    for col in ['country', 'region']:
+        categories = union_categoricals([kept[col].cat.remove_unused_categories(), rewritten[col]],
+                                        sort_categories=True).categories
+        kept[col] = kept[col].cat.set_categories(categories)
+        rewritten[col] = rewritten[col].cat.set_categories(categories)
+    df = pd.concat([kept, rewritten], ignore_index=True)
+    df.to_feather(cache_path, compression='uncompressed')
+    return cache_path
+
+def cache_is_fresh(csv_path=CLEANED_CSV_PATH, cache_path=CLEANED_CACHE_PATH):
+    """True when the Feather copy exists and is at least as new as the CSV."""
+    if not os.path.exists(cache_path):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return os.path.getmtime(cache_path) >= os.path.getmtime(csv_path)
+
+@stage('load_visitors')
+def load_visitors(csv_path=CLEANED_CSV_PATH, cache_path=CLEANED_CACHE_PATH):
+    """Load the cleaned visitor data, preferring the memory-mapped Feather copy.
+
+    From the cache the counts are ``int64[pyarrow]`` (read-only, not copied)
+    instead of the ``Int64`` of the CSV path; both sum and convert alike.
+    """
+    if cache_is_fresh(csv_path, cache_path):
+        import pyarrow as pa
+        from pyarrow import feather
+        table = feather.read_table(cache_path, memory_map=True)
+        # One block per column so NumPy columns can be views of the mapping
+        return table.to_pandas(split_blocks=True, types_mapper={pa.int64(): pd.ArrowDtype(pa.int64())}.get)
+    return to_typed_frame(pd.read_csv(csv_path, dtype=CSV_DTYPES))
@@ -0,0 +1,196 @@
+"""
+Batched seasonal forecasts of the monthly visitor counts.
+Every country x category series is fitted at once: the cleaned data is laid
+out as one (series x month) array and a Holt-Winters model (damped additive
+trend and seasonality on log counts, i.e. multiplicative seasonality) is run
+as array operations over the months, updating all series together. A small
+grid of smoothing parameters is fitted in the same pass and the best set per
+series is picked by its weighted one-step-ahead error.
+
+The COVID years are down-weighted: each month's update is scaled by a weight
+(``covid_weight``), so with 0 the model carries its 2019 state through
+2020-2022 as if those months were missing, and with the default 0.2 they only
+nudge it (the better of the two when forecasting 2024 from data up to 2023).
+Missing months are skipped the same way.
+
+Usage:
+    python visitor_forecast.py                         # 12 months ahead for every country
+    python visitor_forecast.py --horizon 24 --covid-weight 0 --output raw_data/visitor_forecast.csv
+"""
+
+import argparse
+import itertools
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from dimensions import MONTH_NAMES
+from instrumentation import stage
+from visitor_data import load_visitors
+from visitor_queries import COVID_YEARS
+
+FORECAST_MEASURES = ['total', 'tourist', 'business', 'others']
+SEASON = 12
+# Candidate smoothing parameters for the level, trend and seasonal components
+ALPHAS = (0.1, 0.3, 0.6)
+BETAS = (0.01, 0.05)
+GAMMAS = (0.05, 0.15, 0.3)
+# Trend damping per month (1 = undamped Holt-Winters)
+DAMPING = 0.98
+# Months fitted before one-step errors count towards the parameter choice
+BURN_IN = 2 * SEASON
+# Update weight of the months in COVID_YEARS
+COVID_WEIGHT = 0.2
+
+class SeriesPanel:
+    """Monthly counts per entity and measure as an entity x measure x month array (NaN where missing)."""
+
+    def __init__(self, entities, measures, start_year, values):
+        self.entities = pd.Index(entities)
+        self.measures = list(measures)
+        self.start_year = int(start_year)
+        self.values = np.asarray(values, dtype=float)
+
+    @classmethod
+    def from_frame(cls, df, by='country', measures=FORECAST_MEASURES):
+        """Lay out the cleaned visitor frame on the categorical ``by`` codes and month codes.
+
+        Rows sharing an (entity, month) cell, e.g. the countries of a region,
+        are summed; cells without any data stay NaN.
+        """
+        entities = df[by].astype('category')
+        codes = entities.cat.codes.to_numpy()
+        start_year = int(df['year'].min())
+        months = pd.Categorical(df['month'], categories=MONTH_NAMES).codes
+        periods = (df['year'].to_numpy(dtype=int) - start_year) * SEASON + months
+        n_entities, n_periods = len(entities.cat.categories), periods.max() + 1
+        values = np.full((n_entities, len(measures), n_periods), np.nan)
+        for k, measure in enumerate(measures):
+            column = df[measure].to_numpy(dtype=float, na_value=np.nan)
+            valid = (codes >= 0) & (months >= 0) & ~np.isnan(column)
+            cells = codes[valid] * n_periods + periods[valid]
+            sums = np.bincount(cells, weights=column[valid], minlength=n_entities * n_periods)
+            observed = np.bincount(cells, minlength=n_entities * n_periods) > 0
+            values[:, k, :] = np.where(observed, sums, np.nan).reshape(n_entities, n_periods)
+        return cls(entities.cat.categories, measures, start_year, values)
+
+    def period_years(self, periods):
+        return self.start_year + np.asarray(periods) // SEASON
+
+def update_weights(years, exclude_years=COVID_YEARS, covid_weight=COVID_WEIGHT):
+    """Weight of every month's update: ``covid_weight`` in ``exclude_years``, 1 otherwise."""
+    return np.where(np.isin(years, exclude_years), covid_weight, 1.0)
+
+def _initial_season(z, weights):
+    """Starting seasonal indices: each month's average deviation from its year's mean (0 without data)."""
+    n_series, n_periods = z.shape
+    years = -(-n_periods // SEASON)
+    padded = np.full((n_series, years * SEASON), np.nan)
+    padded[:, :n_periods] = np.where(weights > 0, z, np.nan)
+    by_year = padded.reshape(n_series, years, SEASON)
+    with warnings.catch_warnings():
+        # All-NaN slices (series or years without data) are expected here
+        warnings.simplefilter('ignore', RuntimeWarning)
+        season = np.nanmean(by_year - np.nanmean(by_year, axis=2, keepdims=True), axis=1)
+        season -= np.nanmean(season, axis=1, keepdims=True)
+    return np.nan_to_num(season)
+
+@stage('holt_winters')
+def holt_winters(y, weights, horizon=12, alphas=ALPHAS, betas=BETAS, gammas=GAMMAS, damping=DAMPING):
+    """Fit damped Holt-Winters to every row of ``y`` (series x month counts) and forecast ``horizon`` months.
+
+    ``weights`` scales each month's update (0 skips it). All rows and all
+    combinations of the smoothing parameters are run together; for each row
+    the combination with the lowest weighted one-step error is kept.
+    Returns (forecasts as a series x horizon array, chosen (alpha, beta, gamma) per series).
+    """
+    z = np.log1p(np.clip(y, 0, None))
+    n_series, n_periods = z.shape
+    grid = np.array(list(itertools.product(alphas, betas, gammas)))
+    alpha, beta, gamma = (grid[:, i, None] for i in range(3))
+
+    season = np.broadcast_to(_initial_season(z, weights), (len(grid), n_series, SEASON)).copy()
+    level = np.zeros((len(grid), n_series))
+    trend = np.zeros((len(grid), n_series))
+    started = np.zeros(n_series, dtype=bool)
+    sse = np.zeros((len(grid), n_series))
+    fitted_months = np.zeros(n_series)
+
+    observed = ~np.isnan(z)
+    z = np.nan_to_num(z)
+    for t in range(n_periods):
+        m = t % SEASON
+        w = np.where(observed[:, t], weights[t], 0.0)
+        # A series starts at its first usable month
+        first = ~started & (w > 0)
+        level[:, first] = z[first, t] - season[:, first, m]
+        started |= first
+        active = started & ~first
+
+        prediction = level + damping * trend + season[:, :, m]
+        error = z[:, t] - prediction
+        counted = active & (fitted_months >= BURN_IN)
+        sse += np.where(counted, w * error ** 2, 0.0)
+        fitted_months += active & (w > 0)
+
+        step = np.where(active, w, 0.0)
+        new_level = np.where(started, level + damping * trend + alpha * step * error, level)
+        trend = np.where(active, damping * trend + beta * step * (new_level - level - damping * trend), trend)
+        season[:, :, m] += gamma * step * (z[:, t] - new_level - season[:, :, m])
+        level = new_level
+
+    best = np.argmin(sse, axis=0)
+    rows = np.arange(n_series)
+    level, trend, season = level[best, rows], trend[best, rows], season[best, rows]
+    steps = np.arange(1, horizon + 1)
+    damped = np.cumsum(damping ** steps)
+    months = (n_periods + steps - 1) % SEASON
+    z_forecast = level[:, None] + trend[:, None] * damped + season[:, months]
+    forecasts = np.where(started[:, None], np.expm1(z_forecast).clip(0), np.nan)
+    return forecasts, grid[best]
+
+def forecast_visitors(horizon=12, by='country', measures=FORECAST_MEASURES, exclude_years=COVID_YEARS,
+                      covid_weight=COVID_WEIGHT, df=None):
+    """Forecast ``measures`` per ``by`` for the ``horizon`` months after the latest month in the data.
+
+    Returns a DataFrame with year, month, ``by`` and one column per measure,
+    in the layout of cleaned_visitors.csv.
+    """
+    if df is None:
+        df = load_visitors()
+    with stage('forecast_panel'):
+        panel = SeriesPanel.from_frame(df, by, measures)
+    n_entities, n_measures, n_periods = panel.values.shape
+    weights = update_weights(panel.period_years(np.arange(n_periods)), exclude_years, covid_weight)
+    forecasts, _ = holt_winters(panel.values.reshape(-1, n_periods), weights, horizon)
+
+    periods = n_periods + np.arange(horizon)
+    forecasts = forecasts.reshape(n_entities, n_measures, horizon)
+    frame = pd.DataFrame({
+        'year': np.tile(panel.period_years(periods), n_entities),
+        'month': pd.Categorical.from_codes(np.tile(periods % SEASON, n_entities), categories=MONTH_NAMES, ordered=True),
+        by: pd.Categorical.from_codes(np.repeat(np.arange(n_entities), horizon), categories=panel.entities),
+    })
+    for k, measure in enumerate(measures):
+        frame[measure] = forecasts[:, k, :].ravel().round()
+    return frame
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Forecast monthly visitors per nationality and category.')
+    parser.add_argument('--horizon', type=int, default=12, help='months to forecast (default: 12)')
+    parser.add_argument('--by', choices=['country', 'region'], default='country', help='series entity (default: country)')
+    parser.add_argument('--covid-weight', type=float, default=COVID_WEIGHT,
+                        help=f'weight of the {COVID_YEARS[0]}-{COVID_YEARS[-1]} months, 0 excludes them (default: {COVID_WEIGHT})')
+    parser.add_argument('-o', '--output', metavar='PATH', help='write the forecast as CSV')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    forecast = forecast_visitors(args.horizon, args.by, covid_weight=args.covid_weight)
+    print(f'{forecast[args.by].nunique()} series x {len(FORECAST_MEASURES)} measures forecast in {time.perf_counter() - start:.3f}s')
+    if args.output:
+        forecast.to_csv(args.output, index=False)
+        print(f'Forecast written to {args.output}')
+    else:
+        print(forecast.groupby(['year', 'month'], observed=True)[FORECAST_MEASURES].sum().to_string())
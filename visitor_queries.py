@@ -0,0 +1,143 @@
+"""
+Memoized queries over the visitor cube.
+Charts and dashboards ask for windows of the pre-aggregated counts through
+these functions instead of slicing roll-ups themselves. Parameters are
+normalized and checked first (year lists become sorted tuples; metrics, years
+and ``n`` are checked against the cube) and results are kept in an LRU cache keyed on them, so a sweep over
+many windows reuses one set of roll-ups and repeats no work. Cached results
+are shared, so callers must not modify them in place.
+"""
+
+from functools import lru_cache
+from numbers import Integral
+
+import pandas as pd
+
+from growth_analytics import GrowthMatrix
+from visitor_cube import load_classified_cube, select_years
+
+# Years distorted by COVID-19 travel restrictions, left out of trend charts
+COVID_YEARS = (2020, 2021, 2022)
+
+QUERY_CACHE_SIZE = 512
+
+def normalize_years(years):
+    """``years`` (one year or an iterable of years) as a sorted tuple of ints; None stays None (all years)."""
+    if years is None:
+        return None
+    if isinstance(years, Integral):
+        return (int(years),)
+    return tuple(sorted({int(year) for year in years}))
+
+def years_label(years):
+    """'2023-2024' for a consecutive run of years, otherwise the years joined by commas."""
+    years = normalize_years(years)
+    if len(years) > 1 and years[-1] - years[0] == len(years) - 1:
+        return f'{years[0]}-{years[-1]}'
+    return ', '.join(map(str, years))
+
+def _resolve(cube, metric, *dims):
+    cube = load_classified_cube() if cube is None else cube
+    if metric not in cube.measures:
+        raise ValueError(f'Unknown metric: {metric!r} (expected one of {cube.measures})')
+    unknown = set(dims) - set(cube.dimensions)
+    if unknown:
+        raise ValueError(f'Unknown cube dimensions: {sorted(unknown)}')
+    return cube
+
+def _check_window(cube, years, exclude):
+    """Raise ValueError if ``years`` minus ``exclude`` is empty and KeyError if any of them has no data."""
+    if years is None:
+        return
+    wanted = [year for year in years if year not in (exclude or ())]
+    if not wanted:
+        raise ValueError('years must include at least one year that is not excluded')
+    missing = sorted(set(wanted) - set(cube.rollup('year').index))
+    if missing:
+        raise KeyError(f"No data for year(s) {', '.join(map(str, missing))}")
+
+def _check_n(n):
+    if n is not None and n < 1:
+        raise ValueError(f'n must be at least 1 (or None for all), got {n}')
+
+def _window(cube, dims, years, exclude):
+    """Roll-up of ``cube`` on year + ``dims`` restricted to ``years`` minus ``exclude``."""
+    frame = cube.rollup('year', *dims)
+    if years is not None:
+        frame = select_years(frame, years)
+    if exclude:
+        frame = frame[~frame.index.get_level_values('year').isin(exclude)]
+    return frame
+
+def yearly_totals(years=None, metric='tourist', exclude=(), cube=None):
+    """Total ``metric`` per year as a Series indexed by year."""
+    cube = _resolve(cube, metric)
+    years, exclude = normalize_years(years), normalize_years(exclude)
+    _check_window(cube, years, exclude)
+    return _yearly_totals(cube, years, metric, exclude)
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _yearly_totals(cube, years, metric, exclude):
+    return _window(cube, (), years, exclude)[metric]
+
+def yearly_breakdown(by='country', years=None, metric='tourist', exclude=(), cube=None):
+    """``metric`` per year and ``by`` as a year x ``by`` DataFrame (0 where absent)."""
+    cube = _resolve(cube, metric, by)
+    years, exclude = normalize_years(years), normalize_years(exclude)
+    _check_window(cube, years, exclude)
+    return _yearly_breakdown(cube, by, years, metric, exclude)
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _yearly_breakdown(cube, by, years, metric, exclude):
+    return _window(cube, (by,), years, exclude)[metric].unstack(by, fill_value=0)
+
+def top_countries(years=(2023, 2024), metric='tourist', n=10, cube=None):
+    """Countries with the most ``metric`` summed over ``years``, largest first.
+
+    Returns a Series indexed by country; ``n=None`` keeps every country.
+    """
+    cube = _resolve(cube, metric, 'country')
+    years = normalize_years(years)
+    _check_window(cube, years, ())
+    _check_n(n)
+    return _top_countries(cube, years, metric, n)
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _top_countries(cube, years, metric, n):
+    totals = _window(cube, ('country',), years, ()).groupby(level='country', observed=True)[metric].sum()
+    return totals.nlargest(n) if n else totals.sort_values(ascending=False)
+
+def growth_matrix(by='country', metric='tourist', cube=None):
+    """GrowthMatrix of ``metric`` per ``by`` (rows) and year (columns), NaN where absent."""
+    cube = _resolve(cube, metric, by)
+    return _growth_matrix(cube, by, metric)
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _growth_matrix(cube, by, metric):
+    return GrowthMatrix.from_rollup(cube.rollup('year', by)[metric])
+
+def growth(base, target, metric='tourist', n=None, by='country', cube=None):
+    """Percentage change in ``metric`` per ``by`` between years ``base`` and ``target``.
+
+    Returns a DataFrame indexed by ``by`` with columns ``base``, ``target`` and
+    ``growth_pct``, largest growth first and cut to the top ``n`` if given.
+    Only entries present in both years are kept.
+    """
+    cube = _resolve(cube, metric, by)
+    _check_n(n)
+    return _growth(cube, int(base), int(target), metric, n, by)
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _growth(cube, base, target, metric, n, by):
+    matrix = _growth_matrix(cube, by, metric)
+    table = pd.DataFrame({
+        'base': matrix.column(base),
+        'target': matrix.column(target),
+        'growth_pct': matrix.period_growth(base, target),
+    }, index=matrix.entities)[matrix.present(base, target)]
+    return table.nlargest(n, 'growth_pct') if n else table.sort_values('growth_pct', ascending=False)
+
+def clear_query_cache():
+    """Drop every memoized query result (e.g. after the visitor data is rebuilt)."""
+    for query in (_yearly_totals, _yearly_breakdown, _top_countries, _growth_matrix, _growth):
+        query.cache_clear()
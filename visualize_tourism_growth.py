@@ -1,60 +1,52 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
-from matplotlib import font_manager
-import warnings
-warnings.filterwarnings('ignore')
-import bar_chart_race as bcr
 from plot_config import *
+from instrumentation import chart
+from dimensions import MONTH_ABBREVIATIONS, MONTH_NAMES
+from growth_analytics import GrowthMatrix
+from heatmaps import draw_heatmap, share_matrix
+from multi_line import draw_series, series_from_frame
+from visitor_cube import load_classified_cube
+from visitor_queries import COVID_YEARS, growth, top_countries, yearly_breakdown, yearly_totals, years_label
 
-# Create visualizations folder if it doesn't exist
-import os
-if not os.path.exists('visualizations'):
-    os.makedirs('visualizations')
-
-# Load the cleaned data
-df = pd.read_csv('raw_data/cleaned_visitors.csv')
-
-# Convert year to datetime for better plotting
-df['year'] = pd.to_numeric(df['year'], errors='coerce')
-df['date'] = pd.to_datetime(df['year'].astype(str) + '-' + df['month'] + '-01')
-
-# Filter out "Unclassified" countries and 2025 data
-df = df[~df['country'].str.contains('Unclassified', na=False)]
-df = df[df['year'] <= 2024]
+# Charts read the pre-aggregated visitor counts, excluding "Unclassified"
+# countries and 2025 data; pass ``cube`` to render from a pre-computed slice.
+# Time windows are parameters, answered by the memoized queries in visitor_queries.
+# matplotlib, seaborn and the race renderer are imported when a chart runs.
 
 
 
 # 1. Total Tourists Over Time
-def plot_total_visitors_growth():
+@chart
+def plot_total_visitors_growth(cube=None):
+    if cube is None:
+        cube = load_classified_cube()
+    plt = pyplot()
     # Aggregate by year using tourist data
-    yearly_data = df.groupby('year')['tourist'].sum().reset_index()
+    yearly_data = yearly_totals(cube=cube).reset_index()
     yearly_data = yearly_data.sort_values('year')
     
     # Create figure
-    fig, ax = plt.subplots(figsize=(16, 10))
+    fig, ax = styled_figure((16, 10), title=f"Japan Tourism: Total Tourists ({years_label(yearly_data['year'])})",
+                            xlabel='Year', ylabel='Total Tourists (In Millions)')
     
     # Plot total tourists (in millions) with darker color
     line = ax.plot(yearly_data['year'], yearly_data['tourist'] / 1e6, 
                    color='#1f1f1f', linewidth=4, marker='o', markersize=8)
     
-    ax.set_xlabel('Year', **STANDARD_LABEL_CONFIG)
-    ax.set_ylabel('Total Tourists (In Millions)', **STANDARD_LABEL_CONFIG)
-    ax.set_title('Japan Tourism: Total Tourists (1996-2024)', **STANDARD_TITLE_CONFIG)
     ax.grid(True, alpha=0.3)
     
     # Rotate x-axis labels 90 degrees
     ax.tick_params(axis='x', rotation=90)
     
     # Set all years on x-axis
-    all_years = sorted(df['year'].unique())
+    all_years = sorted(yearly_data['year'])
     ax.set_xticks(all_years)
     ax.set_xticklabels(all_years, rotation=90)
     
     # Add COVID period markers
-    covid_start = 2020
-    covid_end = 2022
+    covid_start = COVID_YEARS[0]
+    covid_end = COVID_YEARS[-1]
     ax.axvspan(covid_start, covid_end, alpha=0.3, color='red', label='COVID Period')
     ax.axvline(x=covid_start, color='red', linestyle='--', alpha=0.7, linewidth=2)
     ax.axvline(x=covid_end, color='red', linestyle='--', alpha=0.7, linewidth=2)
@@ -63,256 +55,179 @@ def plot_total_visitors_growth():
     ax.legend(loc='upper left')
     
     plt.tight_layout()
-    plt.savefig('visualizations/total_visitors_growth.png', **STANDARD_FIGURE_CONFIG)
+    save_figure('total_visitors_growth.png')
     plt.close()
 
-# 3. Top 10 Countries by Tourist Count (2023-2024) - Sorted in descending order
-def plot_top_countries():
-    # Calculate total tourists by country for 2023-2024
-    recent_data = df[df['year'].isin([2023, 2024])]
-    country_totals = recent_data.groupby('country')['tourist'].sum().reset_index()
-    top_10_countries = country_totals.nlargest(10, 'tourist').sort_values('tourist', ascending=True)
-    
-    # Create the plot
-    fig, ax = plt.subplots(figsize=(14, 10))
-    
-    # Use seaborn flare color palette
-    colors = COLOR_PALETTE[:len(top_10_countries)]
-    bars = ax.barh(top_10_countries['country'], top_10_countries['tourist'] / 1e6, 
-                   color=colors, alpha=0.8, edgecolor='black', linewidth=1)
-    
-    ax.set_title('Top 10 Countries by Tourist Visitors to Japan (2023-2024)', **STANDARD_TITLE_CONFIG)
-    ax.set_xlabel('Total Tourists (In Millions)', **STANDARD_LABEL_CONFIG)
-    ax.set_ylabel('Country', **STANDARD_LABEL_CONFIG)
-    
-    # Add value labels on bars
-    for bar, total in zip(bars, top_10_countries['tourist']):
-        width = bar.get_width()
-        ax.text(width + width*0.01, bar.get_y() + bar.get_height()/2,
-               f'{total/1e6:.1f}M', ha='left', va='center', fontweight='bold')
-    
-    # Format x-axis with millions
-    ax.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x:.1f}M'))
-    
-    plt.tight_layout()
-    plt.savefig('visualizations/top_10_countries.png', **STANDARD_FIGURE_CONFIG)
-    plt.close()
+def _update_bars(template, labels, values, label_texts, label_x):
+    """Point a horizontal bar template at new data: bar widths, y tick labels and value labels."""
+    bars, texts = template.artists
+    for bar, text, value, label_text in zip(bars, texts, values, label_texts):
+        bar.set_width(value)
+        text.set_position((label_x(value), bar.get_y() + bar.get_height()/2))
+        text.set_text(label_text)
+    template.ax.set_yticks(range(len(labels)), labels)
+    template.ax.relim()
+    template.ax.autoscale_view()
 
-# 4. Top 10 Countries with Highest Post-COVID Growth - Sorted in descending order
-def plot_post_covid_growth():
-    # Calculate 2011 and 2024 totals by country
-    pre_period = df[df['year'] == 2011].groupby('country')['tourist'].sum().reset_index()
-    post_period = df[df['year'] == 2024].groupby('country')['tourist'].sum().reset_index()
-    
-    # Merge and calculate growth
-    growth_data = pre_period.merge(post_period, on='country', suffixes=('_2011', '_2024'))
-    growth_data['growth_percentage'] = ((growth_data['tourist_2024'] - growth_data['tourist_2011']) / 
-                                       growth_data['tourist_2011']) * 100
-    
-    # Get top 10 by growth percentage and sort in descending order
-    top_10_growth = growth_data.nlargest(10, 'growth_percentage').sort_values('growth_percentage', ascending=True)
-    
-    # Create the plot
-    fig, ax = plt.subplots(figsize=(14, 10))
-    
-    # Use the mixed palette for consistency
-    colors = COLOR_PALETTE[:len(top_10_growth)]
-    bars = ax.barh(top_10_growth['country'], top_10_growth['growth_percentage'], 
-                   color=colors, alpha=0.8, edgecolor='black', linewidth=1)
-    
-    ax.set_title('Top 10 Countries with Highest Growth (2011 vs 2024)', **STANDARD_TITLE_CONFIG)
-    ax.set_xlabel('Growth Percentage (%)', **STANDARD_LABEL_CONFIG)
-    ax.set_ylabel('Country', **STANDARD_LABEL_CONFIG)
-    
-    # Add percentage labels on bars (rounded, no decimals)
-    for bar, pct in zip(bars, top_10_growth['growth_percentage']):
-        width = bar.get_width()
-        ax.text(width + 1, bar.get_y() + bar.get_height()/2,
-               f'{int(round(pct))}%', ha='left', va='center', fontweight='bold')
-    
-    # Add a vertical line at 0%
-    ax.axvline(x=0, color='black', linestyle='-', alpha=0.5)
-    
-    plt.tight_layout()
-    plt.savefig('visualizations/top_10_highest_growth.png', **STANDARD_FIGURE_CONFIG)
-    plt.close()
+def _barh_template(key, rows, figsize, xlabel, ylabel, decorate=None, **bar_kwargs):
+    """Horizontal bar chart with ``rows`` bars and a bold value label per bar (see figure_template).
 
-def plot_monthly_distribution_heatmap():
-    # Prepare data: map full month names to abbreviations
-    month_full_to_abbr = {
-        'January': 'Jan', 'February': 'Feb', 'March': 'Mar', 'April': 'Apr',
-        'May': 'May', 'June': 'Jun', 'July': 'Jul', 'August': 'Aug',
-        'September': 'Sep', 'October': 'Oct', 'November': 'Nov', 'December': 'Dec',
-        'Jan': 'Jan', 'Feb': 'Feb', 'Mar': 'Mar', 'Apr': 'Apr',
-        'Jun': 'Jun', 'Jul': 'Jul', 'Aug': 'Aug', 'Sep': 'Sep', 'Oct': 'Oct', 'Nov': 'Nov', 'Dec': 'Dec'
-    }
-    df['month'] = df['month'].map(month_full_to_abbr).fillna(df['month'])
+    ``decorate(ax)`` adds the fixed parts (formatters, reference lines) when the template is built.
+    """
+    def build(ax):
+        bars = ax.barh(range(rows), np.zeros(rows), **bar_kwargs)
+        texts = [ax.text(0, 0, '', ha='left', va='center', fontweight='bold') for _ in bars]
+        if decorate is not None:
+            decorate(ax)
+        return bars, texts
+    return figure_template(key + (rows,), build, figsize, xlabel=xlabel, ylabel=ylabel)
 
-    month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    df['month'] = pd.Categorical(df['month'], categories=month_order, ordered=True)
-    
-    # Exclude 2020, 2021, 2022
-    filtered_df = df[~df['year'].isin([2020, 2021, 2022])]
-    
-    # Group by year and month, sum tourists
-    monthly = filtered_df.groupby(['year', 'month'])['tourist'].sum().reset_index()
+# 3. Top N Countries by Tourist Count over a window of years (2023-2024 by default) - Sorted in descending order
+@chart
+def plot_top_countries(cube=None, years=(2023, 2024), n=10):
+    if n < 1:
+        raise ValueError(f'n must be at least 1, got {n}')
+    if cube is None:
+        cube = load_classified_cube()
+    plt = pyplot()
+    # Calculate total tourists by country over the window
+    top_n_countries = top_countries(years, n=n, cube=cube).reset_index().sort_values('tourist', ascending=True)
+    rows = len(top_n_countries)
+    
+    # Styled figure and bars are built once per bar count and reused for other windows;
+    # the x-axis is formatted in millions
+    template = _barh_template(('top_countries',), rows, (14, 10), 'Total Tourists (In Millions)', 'Country',
+                              lambda ax: ax.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x:.1f}M')),
+                              color=COLOR_PALETTE[:rows], alpha=0.8, edgecolor='black', linewidth=1)
+    
+    # Bar lengths and value labels on bars
+    _update_bars(template, top_n_countries['country'].tolist(), top_n_countries['tourist'] / 1e6,
+                 [f'{total/1e6:.1f}M' for total in top_n_countries['tourist']], lambda width: width + width*0.01)
+    template.ax.set_title(f'Top {n} Countries by Tourist Visitors to Japan ({years_label(years)})', **STANDARD_TITLE_CONFIG)
+    
+    tight_layout(template.fig)
+    save_figure(f'top_{n}_countries.png', template.fig)
+
+# 4. Top N Countries with Highest Growth between two years (2011 vs 2024 by default) - Sorted in descending order
+@chart
+def plot_post_covid_growth(cube=None, base=2011, target=2024, n=10):
+    if cube is None:
+        cube = load_classified_cube()
+    # Growth from the base to the target year for countries present in both, top N by growth
+    top_n_growth = (
+        growth(base, target, n=n, cube=cube)
+          .reset_index()
+          .rename(columns={'growth_pct': 'growth_percentage'})
+          .sort_values('growth_percentage', ascending=True)
+    )
+    rows = len(top_n_growth)
     
-    # Calculate total tourists per year
-    yearly_totals = monthly.groupby('year')['tourist'].sum().reset_index().rename(columns={'tourist': 'year_total'})
-    monthly = monthly.merge(yearly_totals, on='year')
-    # Calculate percentage
-    monthly['pct_of_year'] = (monthly['tourist'] / monthly['year_total']) * 100
+    # Styled figure and bars are built once per bar count and reused for other year pairs,
+    # with a vertical line at 0%
+    template = _barh_template(('post_covid_growth',), rows, (14, 10), 'Growth Percentage (%)', 'Country',
+                              lambda ax: ax.axvline(x=0, color='black', linestyle='-', alpha=0.5),
+                              color=COLOR_PALETTE[:rows], alpha=0.8, edgecolor='black', linewidth=1)
     
-    # Pivot for heatmap
-    heatmap_data = monthly.pivot(index='year', columns='month', values='pct_of_year').reindex(columns=month_order)
+    # Bar lengths and percentage labels on bars (rounded, no decimals)
+    _update_bars(template, top_n_growth['country'].tolist(), top_n_growth['growth_percentage'],
+                 [f'{int(round(pct))}%' for pct in top_n_growth['growth_percentage']], lambda width: width + 1)
+    template.ax.set_title(f'Top {n} Countries with Highest Growth ({base} vs {target})', **STANDARD_TITLE_CONFIG)
     
-    # Create heatmap with single color (blue) and no annotations
-    plt.figure(figsize=(14, 12))
-    sns.heatmap(
-        heatmap_data,
-        cmap=sns.light_palette('#2066a8', as_cmap=True),
-        linewidths=0.5,
-        linecolor='white',
-        annot=False,
-        cbar_kws={'label': '% of Annual Tourists'}
-    )
-    plt.title('Monthly Distribution of Tourists as % of Annual Total', **STANDARD_TITLE_CONFIG)
-    plt.xlabel('Month', **STANDARD_LABEL_CONFIG)
-    plt.ylabel('Year', **STANDARD_LABEL_CONFIG)
-    plt.xticks(fontsize=12, fontweight='normal')
-    plt.yticks(fontsize=12, fontweight='normal')
-    plt.tight_layout()
-    plt.savefig('visualizations/monthly_distribution_heatmap.png', **STANDARD_FIGURE_CONFIG)
-    plt.close()
+    tight_layout(template.fig)
+    save_figure(f'top_{n}_highest_growth.png', template.fig)
 
+@chart
+def plot_monthly_distribution_heatmap(cube=None, exclude_years=COVID_YEARS):
+    if cube is None:
+        cube = load_classified_cube()
 
-def animate_top_15_countries():
-    # Only include years 2001-2019 and 2023-2024 (exclude 2020-2022)
-    valid_years = list(range(2001, 2020)) + [2023, 2024]
-    sub_df = df[df['year'].isin(valid_years)]
-    # Prepare data: sum by year and country
-    yearly_country = sub_df.groupby(['year', 'country'])['tourist'].sum().reset_index()
-    # Pivot for bar_chart_race: index=year, columns=country, values=tourist
-    pivot = yearly_country.pivot(index='year', columns='country', values='tourist').fillna(0)
-    # MP4 export (high quality)
-    bcr.bar_chart_race(
-        df=pivot,
-        filename='visualizations/top_15_countries_barchart_race.mp4',
-        orientation='h',
-        sort='desc',
+    # Tourists by year and month, excluding the COVID years by default
+    monthly = cube.rollup('year', 'month')['tourist']
+    years = monthly.index.get_level_values('year')
+    keep = ~years.isin(exclude_years)
+    # % of each year's total in one year x month array, binned by year and month codes
+    year_codes, year_labels = pd.factorize(years[keep], sort=True)
+    month_codes = pd.Categorical(monthly.index.get_level_values('month')[keep], categories=MONTH_NAMES).codes
+    heatmap_data = share_matrix(year_codes, month_codes, monthly.to_numpy(dtype=float, na_value=np.nan)[keep],
+                                (len(year_labels), len(MONTH_NAMES)))
+
+    # Single color (blue) image with white cell separators and no annotations
+    fig = draw_heatmap(heatmap_data, year_labels, MONTH_ABBREVIATIONS, 'Monthly Distribution of Tourists as % of Annual Total',
+                       xlabel='Month', ylabel='Year', cbar_label='% of Annual Tourists', cell_edges=0.5)
+    save_figure('monthly_distribution_heatmap.png', fig)
+
+
+@chart
+def animate_top_15_countries(cube=None, formats=('mp4', 'gif'), workers=None, years=range(2001, 2025), exclude_years=COVID_YEARS):
+    if cube is None:
+        cube = load_classified_cube()
+    from race_animation import RaceOutput, render_race
+    # Only include years 2001-2024, excluding the COVID years
+    # Pivot for the race: index=year, columns=country, values=tourist
+    pivot = yearly_breakdown('country', years, exclude=exclude_years, cube=cube).astype(float)
+    outputs = {
+        # MP4 export (high quality, more frames for smoother animation)
+        'mp4': RaceOutput(output_file('top_15_countries_barchart_race.mp4'), figsize=(16, 9), dpi=144,
+                          title_size=20, tick_label_size=12, steps_per_period=30),
+        # GIF export (more compact, lower DPI for smaller file)
+        'gif': RaceOutput(output_file('top_15_countries_barchart_race.gif'), figsize=(9, 5.5), dpi=100,
+                          title_size=16, tick_label_size=10, steps_per_period=20),
+    }
+    # Both files are encoded from one pass over the interpolated frames
+    render_race(
+        pivot,
+        [outputs[fmt] for fmt in formats],
+        title=(f'Top 15 Countries by Tourism Visitors to Japan ({pivot.index[0]}-{pivot.index[-1]})'
+               f'\nExcluding Covid Era ({years_label(exclude_years)})'),
         n_bars=15,
         period_length=2500,  # 2.5 seconds per year, total duration < 1 min
-        interpolate_period=True,
-        title='Top 15 Countries by Tourism Visitors to Japan (2001-2024)\nExcluding Covid Era (2020-2022)',
-        title_size=20,  # Bold title size
-        bar_size=.95,
-        period_label=True,
-        period_fmt='{x:.0f}',  # Show year as integer without decimal
-        cmap=['#2066a8'],  # Use custom blue color for all bars
-        filter_column_colors=False,  # Disable to use single color
-        figsize=(16, 9),
-        dpi=144,
-        writer='ffmpeg',
-        steps_per_period=30,  # More frames for smoother animation
-        tick_label_size=12,  # Larger y-axis labels
-        shared_fontdict={'weight': 'bold'}  # Make all text bold
-    )
-    # GIF export (smaller size, smoother)
-    bcr.bar_chart_race(
-        df=pivot,
-        filename='visualizations/top_15_countries_barchart_race.gif',
-        orientation='h',
-        sort='desc',
-        n_bars=15,
-        period_length=2500,  # 2.5 seconds per year
-        interpolate_period=True,
-        title='Top 15 Countries by Tourism Visitors to Japan (2001-2024)\nExcluding Covid Era (2020-2022)',
-        title_size=16,  # Slightly smaller title for GIF
-        bar_size=.95,
-        period_label=True,
-        period_fmt='{x:.0f}',
-        cmap=['#2066a8'],
-        filter_column_colors=False,
-        figsize=(9, 5.5),  # More compact for GIF
-        dpi=100,           # Lower DPI for smaller file
-        writer='imagemagick',
-        steps_per_period=20,  # Smoother animation
-        tick_label_size=10,
-        shared_fontdict={'weight': 'bold'}
+        color='#2066a8',  # Use custom blue color for all bars
+        workers=workers,
     )
 
-def plot_two_period_growth_comparison():
+@chart
+def plot_two_period_growth_comparison(cube=None, years=(2014, 2019, 2024)):
+    if cube is None:
+        cube = load_classified_cube()
+    start, middle, end = years
+    plt = pyplot()
     # Load global data
     global_data = pd.read_csv('raw_data/tourism_top_10_countries.csv')
     global_data['Total_tourists'] = global_data['Total_tourists'].str.replace(',', '').astype(float)
     
-    # Get the list of top 10 countries (excluding Japan)
-    top_countries = global_data['Country'].unique().tolist()
-    if 'Japan' in top_countries:
-        top_countries.remove('Japan')
-    
-    # Aggregate Japan's total tourism for 2014, 2019, 2024
-    japan_years = [2014, 2019, 2024]
-    japan_agg = (
-        df[df['year'].isin(japan_years)]
-          .groupby('year')['tourist'].sum()
-          .reset_index()
-          .rename(columns={'year': 'Year', 'tourist': 'Total_tourists'})
-    )
-    japan_agg['Country'] = 'Japan'
-    
-    # Build a combined dataframe for all countries (10 + Japan)
-    all_countries = top_countries + ['Japan']
-    records = []
-    for country in all_countries:
-        if country == 'Japan':
-            for y in japan_years:
-                val = japan_agg[japan_agg['Year'] == y]['Total_tourists']
-                if not val.empty:
-                    records.append({'Country': 'Japan', 'Year': y, 'Total_tourists': val.values[0]})
-        else:
-            for y in japan_years:
-                val = global_data[(global_data['Country'] == country) & (global_data['Year'] == y)]['Total_tourists']
-                if not val.empty:
-                    records.append({'Country': country, 'Year': y, 'Total_tourists': val.values[0]})
-    combined = pd.DataFrame(records)
-    
-    # Calculate growth rates for each country
-    growth_data = []
-    for country in all_countries:
-        cdata = combined[combined['Country'] == country]
-        y2014 = cdata[cdata['Year'] == 2014]['Total_tourists']
-        y2019 = cdata[cdata['Year'] == 2019]['Total_tourists']
-        y2024 = cdata[cdata['Year'] == 2024]['Total_tourists']
-        if not (y2014.empty or y2019.empty or y2024.empty):
-            growth_14_19 = ((y2019.values[0] - y2014.values[0]) / y2014.values[0]) * 100
-            growth_19_24 = ((y2024.values[0] - y2019.values[0]) / y2019.values[0]) * 100
-            growth_data.append({
-                'Country': country,
-                'Growth_2014_2019': growth_14_19,
-                'Growth_2019_2024': growth_19_24
-            })
-    growth_df = pd.DataFrame(growth_data)
-    # Sort to put Japan first, then by 2019-2024 growth for visual clarity
+    # Japan's totals from the visitor cube replace any Japan rows in the global table
+    japan = yearly_totals(cube=cube)
+    rows = pd.concat([
+        global_data.loc[global_data['Country'] != 'Japan', ['Country', 'Year', 'Total_tourists']],
+        pd.DataFrame({'Country': 'Japan', 'Year': japan.index, 'Total_tourists': japan.to_numpy()}),
+    ])
+    
+    # One country x year matrix; growth for both periods is computed for all countries at once
+    matrix = GrowthMatrix.from_long(rows, 'Country', 'Year', 'Total_tourists')
+    growth_df = pd.DataFrame({
+        'Country': matrix.entities,
+        'Growth_first': matrix.period_growth(start, middle),
+        'Growth_second': matrix.period_growth(middle, end),
+    })[matrix.present(start, middle, end)]
+    # Sort to put Japan first, then by second-period growth for visual clarity
     growth_df['is_japan'] = growth_df['Country'] == 'Japan'
-    growth_df = growth_df.sort_values(['is_japan', 'Growth_2019_2024'], ascending=[False, False])
+    growth_df = growth_df.sort_values(['is_japan', 'Growth_second'], ascending=[False, False])
     growth_df = growth_df.drop('is_japan', axis=1)
     
     # Plot grouped bar chart
     x = np.arange(len(growth_df))
     width = 0.35
-    fig, ax = plt.subplots(figsize=(20, 10))  # Increased width to accommodate all 11 countries
+    # Increased width to accommodate all 11 countries
+    fig, ax = styled_figure((20, 10), title='Top Global Destinations: Tourism Growth Rate', ylabel='Growth Rate (%)')
     
     # Use consistent colors for all countries
-    period1_color = '#2066a8'  # Dark blue for 2014→2019
-    period2_color = '#ae282c'  # Dark red for 2019→2024
+    period1_color = '#2066a8'  # Dark blue for the first period (2014→2019)
+    period2_color = '#ae282c'  # Dark red for the second period (2019→2024)
     
-    bars1 = ax.bar(x - width/2, growth_df['Growth_2014_2019'], width, label='2014→2019', color=period1_color, alpha=0.8)
-    bars2 = ax.bar(x + width/2, growth_df['Growth_2019_2024'], width, label='2019→2024', color=period2_color, alpha=0.8)
+    bars1 = ax.bar(x - width/2, growth_df['Growth_first'], width, label=f'{start}→{middle}', color=period1_color, alpha=0.8)
+    bars2 = ax.bar(x + width/2, growth_df['Growth_second'], width, label=f'{middle}→{end}', color=period2_color, alpha=0.8)
     ax.set_xticks(x)
     ax.set_xticklabels(growth_df['Country'], rotation=0, ha='center', fontsize=11)  # No rotation, smaller font
-    ax.set_ylabel('Growth Rate (%)', **STANDARD_LABEL_CONFIG)
-    ax.set_title('Top Global Destinations: Tourism Growth Rate', **STANDARD_TITLE_CONFIG)
     ax.legend(fontsize=12)
     ax.grid(True, axis='y', alpha=0.3)
     # Add value labels
@@ -323,18 +238,20 @@ def plot_two_period_growth_comparison():
         height = bar.get_height()
         ax.text(bar.get_x() + bar.get_width()/2., height + 1, f'{height:.1f}%', ha='center', va='bottom', fontsize=10)
     plt.tight_layout()
-    plt.savefig('visualizations/two_period_growth_comparison.png', **STANDARD_FIGURE_CONFIG)
+    save_figure('two_period_growth_comparison.png')
     plt.close()
 
-def plot_stacked_region_distribution():
-    df2 = df.copy()
-    # Exclude unreliable years (2020-2022) and Africa
-    df2 = df2[~df2['year'].isin([2020, 2021, 2022])]
-    df2 = df2[df2['region'] != 'Africa']
-    # Aggregate total tourists per year and region
-    agg = df2.groupby(['year', 'region'])['tourist'].sum().reset_index()
-    # Pivot to get regions as columns
-    pivot = agg.pivot_table(index='year', columns='region', values='tourist', fill_value=0)
+@chart
+def plot_stacked_region_distribution(cube=None, exclude_years=COVID_YEARS, exclude_regions=('Africa',)):
+    if cube is None:
+        cube = load_classified_cube()
+    plt = pyplot()
+    # Total tourists per year (rows) and region (columns), excluding unreliable years (COVID by default)
+    pivot = yearly_breakdown('region', exclude=exclude_years, cube=cube)
+    # Exclude small regions (Africa by default)
+    pivot = pivot.drop(columns=[region for region in exclude_regions if region in pivot.columns])
+    if pivot.columns.empty:
+        raise ValueError(f'exclude_regions leaves no region to plot: {list(exclude_regions)}')
     # Calculate percentages
     pivot_pct = pivot.div(pivot.sum(axis=1), axis=0) * 100
     # Convert years to string to avoid gaps and reverse order for plotting
@@ -347,7 +264,8 @@ def plot_stacked_region_distribution():
     color_indices = list(range(0, palette_len, max(1, palette_len // len(region_list))))
     colors = [COLOR_PALETTE[i % palette_len] for i in color_indices[:len(region_list)]]
     # Plot horizontal stacked bar chart
-    plt.figure(figsize=(16, 10))
+    styled_figure((16, 10), title='Tourist Region Distribution by Year (Excl. Covid Era)',
+                  xlabel='Percentage of Total Tourists (%)', ylabel='Year', grid='x')
     bottom = None
     for i, region in enumerate(region_list):
         plt.barh(year_labels, pivot_pct[region], left=bottom, label=region, color=colors[i])
@@ -355,19 +273,44 @@ def plot_stacked_region_distribution():
             bottom = pivot_pct[region].copy()
         else:
             bottom += pivot_pct[region]
-    plt.xlabel('Percentage of Total Tourists (%)', **STANDARD_LABEL_CONFIG)
-    plt.ylabel('Year', **STANDARD_LABEL_CONFIG)
-    plt.title('Tourist Region Distribution by Year (Excl. Covid Era)', **STANDARD_TITLE_CONFIG)
     plt.xlim(0, 100)
-    plt.grid(True, axis='x', **STANDARD_GRID_CONFIG)
     # Place legend in a single line at the bottom
     plt.legend(loc='upper center', bbox_to_anchor=(0.5, -0.12), ncol=len(region_list), frameon=False)
     plt.tight_layout(rect=[0, 0.08, 1, 1])
-    plt.savefig('visualizations/stacked_region_distribution.png', **STANDARD_FIGURE_CONFIG)
+    save_figure('stacked_region_distribution.png')
+    plt.close()
+
+# 8. Tourists per Nationality Over Time
+@chart
+def plot_country_trends(cube=None, n=10):
+    if n < 1:
+        raise ValueError(f'n must be at least 1, got {n}')
+    if cube is None:
+        cube = load_classified_cube()
+    plt = pyplot()
+    # One long (year, country) table, grouped once into a line per country (no zeros on the log scale)
+    yearly = cube.rollup('year', 'country')['tourist'].reset_index()
+    yearly = yearly[yearly['tourist'] > 0]
+    series = series_from_frame(yearly, 'country', 'year', 'tourist', sort=True)
+    fig, ax = styled_figure((16, 10), title=f"Tourists by Nationality ({years_label(yearly['year'])})",
+                            xlabel='Year', ylabel='Tourists (log scale)', grid=True)
+    ax.set_yscale('log')
+    ax.axvspan(COVID_YEARS[0], COVID_YEARS[-1], alpha=0.15, color='red')
+    # Colors and legend entries for the N largest nationalities of the latest year
+    draw_series(ax, series, top=n, markersize=4, other_label='{n} other countries',
+                title='Country', loc='lower left', ncol=2)
+    plt.tight_layout()
+    save_figure('country_tourist_trends.png')
     plt.close()
 
 # Main execution
 if __name__ == "__main__":
+    import os
+    import warnings
+    warnings.filterwarnings('ignore')
+    # Create visualizations folder if it doesn't exist
+    os.makedirs('visualizations', exist_ok=True)
+
     print("Creating visualizations...")
     
     # Create all visualizations
@@ -392,4 +335,7 @@ if __name__ == "__main__":
     plot_stacked_region_distribution()
     print("Stacked bar chart (region distribution) created")
     
+    plot_country_trends()
+    print("Per-nationality trend chart created")
+    
     print("\nAll visualizations saved in the 'visualizations' folder!") 
\ No newline at end of file